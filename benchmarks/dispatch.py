@@ -0,0 +1,101 @@
+"""Runs messages through the bot's command dispatch and counts discord API calls.
+
+    python -m benchmarks.dispatch --iterations 20
+"""
+import argparse
+import asyncio
+import logging
+import tempfile
+from collections import Counter
+from typing import List
+
+from benchmarks.harness import Dispatch, Harness, load_bot, prepare_environment
+from benchmarks.run import TEAM_SIZE, make_servers, percentile
+
+DISPATCH_EXTENSIONS = [
+    "bot.cogs.pavlov",
+    "bot.cogs.pavlov_captain",
+    "bot.cogs.pavlov_mod",
+    "bot.cogs.pavlov_admin",
+    "bot.cogs.teams",
+    "bot.cogs.help",
+    "bot.cogs.utility",
+]
+
+# message, roles of the author, an author without roles is no admin either
+ADMIN = None
+DISPATCH_MESSAGES = [
+    (";servers", ADMIN),
+    (";help", ADMIN),
+    (";aliases", ADMIN),
+    (";serverinfo bench0", ADMIN),
+    (";players bench0", ADMIN),
+    (";switchmap datacenter SND bench0", ["Captain-bench0"]),
+    (";ban 76561190000000000 bench0", []),
+    (";serverinfo missing", ADMIN),
+    (";anyoneplaying", ADMIN),
+]
+API_CALLS = ["send", "edit", "add_reaction", "typing"]
+
+
+def summarize(content: str, dispatches: List[Dispatch]) -> str:
+    calls = Counter()
+    for dispatch in dispatches:
+        calls.update(dispatch.calls)
+    runs = len(dispatches)
+    errors = len([dispatch for dispatch in dispatches if dispatch.error is not None])
+    elapsed = [dispatch.elapsed * 1000 for dispatch in dispatches]
+    first_reply = [
+        dispatch.first_reply * 1000 for dispatch in dispatches if dispatch.first_reply is not None
+    ]
+    per_run = " ".join(f"{calls[call] / runs:>6.1f}" for call in API_CALLS)
+    first = f"{percentile(first_reply, 0.5):>8.1f}" if first_reply else f"{'-':>8}"
+    return (
+        f"{content:<36.36} {runs:>4} {errors:>6} {per_run} "
+        f"{percentile(elapsed, 0.5):>8.1f} {percentile(elapsed, 0.95):>8.1f} {first}"
+    )
+
+
+async def benchmark(args):
+    mocks = make_servers(args)
+    ports = {mock.name: await mock.start() for mock in mocks}
+    players = list(mocks[0].players)
+    teams = {"bench_ct": players[:TEAM_SIZE], "bench_t": players[TEAM_SIZE:]}
+    prepare_environment(args.directory, ports, teams)
+    bot = load_bot(DISPATCH_EXTENSIONS)
+    logging.getLogger().setLevel(logging.ERROR)  # RCON traffic and failed checks are logged
+    harness = Harness(bot)
+
+    print(f"{'message':<36} {'runs':>4} {'errors':>6} ", end="")
+    print(" ".join(f"{call[:6]:>6}" for call in API_CALLS), end="")
+    print(f" {'p50 ms':>8} {'p95 ms':>8} {'reply ms':>8}")
+    try:
+        for content, roles in DISPATCH_MESSAGES:
+            author = harness.member() if roles is ADMIN else harness.member(0, roles)
+            dispatches = [
+                await harness.dispatch(content, author) for _ in range(args.iterations)
+            ]
+            print(summarize(content, dispatches))
+    finally:
+        from bot.utils import rcon_pool
+
+        await rcon_pool.close()
+        for mock in mocks:
+            await mock.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--servers", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="seconds")
+    parser.add_argument("--iterations", type=int, default=20)
+    args = parser.parse_args()
+    args.dead, args.drop_rate, args.timeout_rate = 0, 0.0, 0.0
+    with tempfile.TemporaryDirectory() as directory:
+        args.directory = directory
+        asyncio.get_event_loop().run_until_complete(benchmark(args))
+
+
+if __name__ == "__main__":
+    main()
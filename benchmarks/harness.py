@@ -0,0 +1,242 @@
+import asyncio
+import importlib
+import itertools
+import json
+import os
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List
+
+from benchmarks.mock_rcon import MOCK_MAPS
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+BENCH_ADMIN_ID = 1
+BENCH_BOT_ID = 2
+BENCH_GUILD_ID = 3
+
+_channel_ids = itertools.count(1)
+
+BENCH_EXTENSIONS = [
+    "bot.cogs.pavlov",
+    "bot.cogs.pavlov_captain",
+    "bot.cogs.pavlov_mod",
+    "bot.cogs.pavlov_admin",
+    "bot.cogs.teams",
+]
+
+
+class FakeMessage:
+    def __init__(self, channel, content: str = None, embed=None, file=None, author=None):
+        self.id = len(channel.messages)
+        self.channel = channel
+        self.guild = channel.guild
+        self.author = author
+        self.content = content
+        self.embed = embed
+        self.file = file
+        self._state = None
+
+    async def edit(self, content: str = None, embed=None):
+        self.channel.calls["edit"] += 1
+        if content is not None:
+            self.content = content
+        if embed is not None:
+            self.embed = embed
+
+    async def add_reaction(self, emoji):
+        self.channel.calls["add_reaction"] += 1
+
+    async def remove_reaction(self, emoji, member):
+        self.channel.calls["remove_reaction"] += 1
+
+    async def clear_reactions(self):
+        self.channel.calls["clear_reactions"] += 1
+
+    async def delete(self):
+        self.channel.calls["delete"] += 1
+
+
+class FakeChannel:
+    """Keeps the messages sent to it and counts the discord API calls made through it."""
+
+    def __init__(self, guild=None):
+        self.id = next(_channel_ids)
+        self.guild = guild
+        self.messages: List[FakeMessage] = list()
+        self.calls = Counter()
+        self.first_send = None
+
+    def record(self, call: str):
+        self.calls[call] += 1
+
+    async def send(self, content: str = None, embed=None, file=None, **kwargs):
+        if self.first_send is None:
+            self.first_send = time.perf_counter()
+        self.record("send")
+        message = FakeMessage(self, content, embed, file)
+        self.messages.append(message)
+        return message
+
+    async def trigger_typing(self):
+        self.record("typing")
+
+
+class FakeRole:
+    def __init__(self, name: str, role_id: int = 0):
+        self.id = role_id
+        self.name = name
+
+
+class FakeGuild:
+    def __init__(self, guild_id: int = BENCH_GUILD_ID, roles: List[str] = ()):
+        self.id = guild_id
+        self.roles = [FakeRole(name, index) for index, name in enumerate(roles)]
+
+
+class FakeAuthor:
+    def __init__(
+        self,
+        author_id: int = BENCH_ADMIN_ID,
+        name: str = "bench",
+        roles: List[str] = (),
+        guild: FakeGuild = None,
+    ):
+        self.id = author_id
+        self.name = name
+        self.mention = f"<@{author_id}>"
+        self.discriminator = "0000"
+        self.roles = [FakeRole(name) for name in roles]
+        self.guild = guild
+        self.bot = False
+
+
+class FakeContext:
+    """The parts of a command context the cogs use, for calling cog commands directly."""
+
+    def __init__(self, bot, author: FakeAuthor = None):
+        self.bot = bot
+        self.author = author or FakeAuthor()
+        self.guild = self.author.guild
+        self.channel = FakeChannel(self.guild)
+        self.command = None
+        self.batch_exec = False
+        self.batch_steps = None
+
+    async def send(self, content: str = None, embed=None, file=None, coalesce: bool = True):
+        return await self.channel.send(content, embed=embed, file=file)
+
+    async def trigger_typing(self):
+        await self.channel.trigger_typing()
+
+
+def recording_context(base):
+    """A real command context class whose discord API calls go to its fake channel.
+
+    `base` is the bot's context class, which can only be imported with the bot.
+    """
+
+    class RecordingContext(base):
+        error = None
+
+        async def _deliver(self, content: str = None, **kwargs):
+            return await self.channel.send(content, **kwargs)
+
+        async def trigger_typing(self):
+            await self.channel.trigger_typing()
+
+    return RecordingContext
+
+
+class Dispatch:
+    """Outcome of one message run through the bot's command processing."""
+
+    def __init__(self, content: str, ctx, started: float, finished: float):
+        self.content = content
+        self.command = ctx.command.qualified_name if ctx.command else None
+        self.error = ctx.error
+        self.calls = ctx.channel.calls
+        self.messages = ctx.channel.messages
+        self.elapsed = finished - started
+        self.first_reply = None
+        if ctx.channel.first_send is not None:
+            self.first_reply = ctx.channel.first_send - started
+
+
+class Harness:
+    """Runs messages through get_prefix, the checks, before/after_invoke and the cogs.
+
+    Nothing is sent to discord, API calls are recorded per message instead.
+    """
+
+    def __init__(self, bot, guild: FakeGuild = None):
+        from bot.utils.context import PavlovContext
+        from bot.utils.outbox import outbox
+
+        self.bot = bot
+        self.outbox = outbox
+        self.context_class = recording_context(PavlovContext)
+        self.guild = guild or FakeGuild()
+        if bot.user is None:
+            bot._connection.user = FakeAuthor(BENCH_BOT_ID, "pavlov-bot")
+        bot.add_listener(self._on_command_error, "on_command_error")
+
+    def member(self, author_id: int = BENCH_ADMIN_ID, roles: List[str] = ()) -> FakeAuthor:
+        return FakeAuthor(author_id, f"member{author_id}", roles, self.guild)
+
+    async def _on_command_error(self, ctx, error):
+        if isinstance(ctx, self.context_class):
+            ctx.error = error
+
+    async def dispatch(self, content: str, author: FakeAuthor = None) -> Dispatch:
+        channel = FakeChannel(self.guild)
+        message = FakeMessage(channel, content, author=author or self.member())
+        started = time.perf_counter()
+        ctx = await self.bot.get_context(message, cls=self.context_class)
+        await self.bot.invoke(ctx)
+        finished = time.perf_counter()
+        # error handlers are dispatched as tasks, let them record their replies
+        for _ in range(3):
+            await asyncio.sleep(0)
+        await self.outbox.join(channel.id)
+        return Dispatch(content, ctx, started, finished)
+
+
+def prepare_environment(directory: str, server_ports: Dict[str, int], teams: Dict[str, list]):
+    """Writes the bot's JSON files for the mock servers into `directory` and enters it.
+
+    The bot reads its files and fonts relative to the working directory, so the bot
+    package is linked into `directory` as well.
+    """
+    directory = Path(directory)
+    servers = {
+        name: {"ip": "127.0.0.1", "port": port, "password": "password", "admins": [BENCH_ADMIN_ID]}
+        for name, port in server_ports.items()
+    }
+    files = {
+        "config.json": {"prefix": ";", "token": ""},
+        "servers.json": servers,
+        "aliases.json": {
+            "maps": {map_id: map_id for map_id in MOCK_MAPS},
+            "players": {},
+            "teams": teams,
+        },
+        "commands.json": {},
+    }
+    for filename, data in files.items():
+        with open(directory / filename, "w") as file:
+            json.dump(data, file)
+    os.symlink(REPO_ROOT / "bot", directory / "bot")
+    os.chdir(directory)
+    if str(REPO_ROOT) not in sys.path:
+        sys.path.insert(0, str(REPO_ROOT))
+
+
+def load_bot(extensions: List[str] = BENCH_EXTENSIONS):
+    """Imports the bot with the files of `prepare_environment` and loads `extensions`."""
+    bot = importlib.import_module("bot").bot
+    for extension in extensions:
+        if extension not in bot.extensions:
+            bot.load_extension(extension)
+    return bot
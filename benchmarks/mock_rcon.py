@@ -0,0 +1,175 @@
+import asyncio
+import hashlib
+import json
+import logging
+import random
+from typing import Dict, List
+
+MOCK_HOST = "127.0.0.1"
+MOCK_PASSWORD = "password"
+MOCK_MAX_PLAYERS = 10
+MOCK_MAPS = ["datacenter", "sand", "bridge", "container_yard", "station"]
+
+# commands that only answer with {"<Command>": true}
+ACKNOWLEDGED_COMMANDS = {
+    "Ban",
+    "Unban",
+    "Kick",
+    "Kill",
+    "SwitchMap",
+    "RotateMap",
+    "ResetSND",
+    "GiveItem",
+    "GiveCash",
+    "GiveTeamCash",
+    "SetPlayerSkin",
+}
+
+
+class MockPlayer:
+    def __init__(self, unique_id: str, name: str, team_id: int):
+        self.unique_id = unique_id
+        self.name = name
+        self.team_id = team_id
+
+
+class MockRconServer:
+    """Stand-in for a Pavlov server speaking its RCON protocol over TCP.
+
+    Replies are delayed by `latency` plus up to `jitter` seconds. `drop_rate` is the
+    chance a command closes the connection instead of answering, `timeout_rate` the
+    chance it is never answered.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        password: str = MOCK_PASSWORD,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        drop_rate: float = 0.0,
+        timeout_rate: float = 0.0,
+        players: List[MockPlayer] = None,
+        seed: int = None,
+    ):
+        self.name = name
+        self.password = hashlib.md5(password.encode()).hexdigest()
+        self.latency = latency
+        self.jitter = jitter
+        self.drop_rate = drop_rate
+        self.timeout_rate = timeout_rate
+        self.players: Dict[str, MockPlayer] = {
+            player.unique_id: player for player in players or []
+        }
+        self.map_label = MOCK_MAPS[0]
+        self.port = None
+        self.connections = 0
+        self.commands: Dict[str, int] = dict()
+        self._random = random.Random(seed)
+        self._server = None
+
+    async def start(self, host: str = MOCK_HOST, port: int = 0) -> int:
+        """Listens on `port`, a free one by default, and returns it."""
+        self._server = await asyncio.start_server(self._handle, host, port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self.port
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        try:
+            writer.write(b"Password: ")
+            await writer.drain()
+            password = await reader.read(64)
+            if password.decode().strip() != self.password:
+                writer.write(b"Authenticated=0")
+                return
+            writer.write(b"Authenticated=1")
+            await writer.drain()
+            while True:
+                data = await reader.read(1024)
+                if not data:
+                    return
+                command = data.decode().strip()
+                name = command.split(" ")[0]
+                self.commands[name] = self.commands.get(name, 0) + 1
+                chance = self._random.random()
+                if chance < self.drop_rate:
+                    return
+                if chance < self.drop_rate + self.timeout_rate:
+                    continue
+                await asyncio.sleep(self.latency + self._random.uniform(0, self.jitter))
+                writer.write(json.dumps(self.reply(command)).encode())
+                await writer.drain()
+        except ConnectionError:
+            pass
+        except Exception as ex:
+            logging.error(f"MOCK: {self.name} failed handling a connection with {ex!r}")
+        finally:
+            writer.close()
+
+    def reply(self, command: str) -> dict:
+        name, *args = command.split(" ")
+        if name == "ServerInfo":
+            return {
+                "ServerInfo": {
+                    "MapLabel": self.map_label,
+                    "GameMode": "SND",
+                    "ServerName": self.name,
+                    "Teams": True,
+                    "Team0Score": "0",
+                    "Team1Score": "0",
+                    "Round": "1",
+                    "RoundState": "Started",
+                    "PlayerCount": f"{len(self.players)}/{MOCK_MAX_PLAYERS}",
+                }
+            }
+        if name == "RefreshList":
+            return {
+                "PlayerList": [
+                    {"Username": player.name, "UniqueId": player.unique_id}
+                    for player in self.players.values()
+                ]
+            }
+        if name == "InspectPlayer":
+            player = self.players.get(args[0] if args else "")
+            if player is None:
+                return {"PlayerInfo": {}}
+            return {
+                "PlayerInfo": {
+                    "PlayerName": player.name,
+                    "UniqueId": player.unique_id,
+                    "KDA": "0/0/0",
+                    "Score": "0",
+                    "Dead": False,
+                    "Cash": "1000",
+                    "TeamId": player.team_id,
+                }
+            }
+        if name == "SwitchTeam":
+            player = self.players.get(args[0] if args else "")
+            if player is None or len(args) < 2:
+                return {"SwitchTeam": False}
+            player.team_id = int(args[1])
+            return {"SwitchTeam": True}
+        if name == "MapList":
+            return {"MapList": [{"MapId": map_id, "GameMode": "SND"} for map_id in MOCK_MAPS]}
+        if name == "Blacklist":
+            return {"BlackList": []}
+        if name == "ItemList":
+            return {"ItemList": ["ak47", "m4", "knife"]}
+        if name in ("SwitchMap", "RotateMap"):
+            self.map_label = args[0] if name == "SwitchMap" and args else self._next_map()
+        if name in ACKNOWLEDGED_COMMANDS:
+            return {name: True}
+        return {"Command": name, "Successful": False}
+
+    def _next_map(self) -> str:
+        if self.map_label not in MOCK_MAPS:
+            return MOCK_MAPS[0]
+        return MOCK_MAPS[(MOCK_MAPS.index(self.map_label) + 1) % len(MOCK_MAPS)]
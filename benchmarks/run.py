@@ -0,0 +1,172 @@
+"""Drives the bot's commands against local mock RCON servers and reports latencies.
+
+    python -m benchmarks.run --servers 50 --latency 0.02 --jitter 0.01 --dead 2
+"""
+import argparse
+import asyncio
+import logging
+import tempfile
+import time
+from typing import Awaitable, Callable, List
+
+from benchmarks.harness import FakeContext, load_bot, prepare_environment
+from benchmarks.mock_rcon import MockPlayer, MockRconServer
+
+TEAM_SIZE = 5
+SCENARIOS = ["exec_server_command", "serverinfo", "anyoneplaying", "matchsetup", "batch"]
+
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(q * len(ordered)) - 1))]
+
+
+class Result:
+    def __init__(self, name: str, latencies: List[float], errors: int, elapsed: float):
+        self.name = name
+        self.latencies = latencies
+        self.errors = errors
+        self.elapsed = elapsed
+
+    def __str__(self):
+        count = len(self.latencies)
+        if not count:
+            return f"{self.name:<20} {0:>6} {self.errors:>6}"
+        p50, p95, p99 = [percentile(self.latencies, q) * 1000 for q in (0.5, 0.95, 0.99)]
+        return (
+            f"{self.name:<20} {count:>6} {self.errors:>6} {count / self.elapsed:>9.1f} "
+            f"{p50:>8.1f} {p95:>8.1f} {p99:>8.1f}"
+        )
+
+
+async def measure(
+    name: str, operation: Callable[[], Awaitable], iterations: int, concurrency: int
+) -> Result:
+    latencies, errors = list(), 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run():
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                await operation()
+            except Exception as ex:
+                errors += 1
+                logging.debug(f"BENCH: {name} failed with {ex!r}")
+                return
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*[run() for _ in range(iterations)])
+    return Result(name, latencies, errors, time.perf_counter() - started)
+
+
+def make_servers(args) -> List[MockRconServer]:
+    mocks = list()
+    for index in range(args.servers):
+        players = [
+            MockPlayer(str(76561190000000000 + index * 100 + number), f"player{number}", 0)
+            for number in range(2 * TEAM_SIZE if index == 0 else index % 3)
+        ]
+        dead = index >= args.servers - args.dead
+        mocks.append(
+            MockRconServer(
+                f"bench{index}",
+                latency=args.latency,
+                jitter=args.jitter,
+                drop_rate=args.drop_rate,
+                timeout_rate=1.0 if dead else args.timeout_rate,
+                players=players,
+                seed=index,
+            )
+        )
+    return mocks
+
+
+async def benchmark(args):
+    mocks = make_servers(args)
+    ports = {mock.name: await mock.start() for mock in mocks}
+    players = list(mocks[0].players)
+    teams = {"bench_ct": players[:TEAM_SIZE], "bench_t": players[TEAM_SIZE:]}
+    prepare_environment(args.directory, ports, teams)
+    bot = load_bot()
+    logging.getLogger().setLevel(logging.WARNING)  # RCON traffic is logged at INFO
+
+    from bot.cogs import pavlov_captain
+    from bot.utils.pavlov import exec_server_command, server_status
+
+    # a fixed pause, it would only add 10 seconds to every matchsetup
+    pavlov_captain.MATCH_DELAY_RESETSND = 0
+    pavlov, captain = bot.get_cog("Pavlov"), bot.get_cog("PavlovCaptain")
+    healthy = [mock.name for mock in mocks[: args.servers - args.dead]]
+
+    def forget_status():
+        for name in ports:
+            server_status.invalidate(name)
+
+    async def anyoneplaying():
+        forget_status()
+        await pavlov.anyoneplaying(FakeContext(bot))
+
+    async def serverinfo():
+        forget_status()
+        await pavlov.serverinfo(FakeContext(bot), healthy[0])
+
+    async def batch():
+        forget_status()
+        await pavlov.batch(FakeContext(bot), *[f"serverinfo {name}" for name in healthy[:10]])
+
+    operations = {
+        "exec_server_command": lambda: exec_server_command(
+            FakeContext(bot), healthy[0], "RefreshList"
+        ),
+        "serverinfo": serverinfo,
+        "anyoneplaying": anyoneplaying,
+        "matchsetup": lambda: captain.matchsetup(
+            FakeContext(bot), "bench_ct", "bench_t", healthy[0]
+        ),
+        "batch": batch,
+    }
+    print(
+        f"{args.servers} servers ({args.dead} dead), latency {args.latency * 1000:.0f}ms "
+        f"+ up to {args.jitter * 1000:.0f}ms, drop rate {args.drop_rate}, "
+        f"timeout rate {args.timeout_rate}"
+    )
+    print(
+        f"{'scenario':<20} {'ops':>6} {'errors':>6} {'ops/s':>9} "
+        f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+    )
+    try:
+        for name in args.scenarios:
+            concurrency = 1 if name == "matchsetup" else args.concurrency
+            print(await measure(name, operations[name], args.iterations, concurrency))
+    finally:
+        from bot.utils import rcon_pool
+
+        await rcon_pool.close()
+        for mock in mocks:
+            await mock.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--servers", type=int, default=50)
+    parser.add_argument("--dead", type=int, default=0, help="servers that never answer")
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds")
+    parser.add_argument("--jitter", type=float, default=0.01, help="seconds")
+    parser.add_argument("--drop-rate", type=float, default=0.0)
+    parser.add_argument("--timeout-rate", type=float, default=0.0)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    args = parser.parse_args()
+    if args.dead >= args.servers:
+        parser.error("at least one server has to answer")
+    with tempfile.TemporaryDirectory() as directory:
+        args.directory = directory
+        asyncio.get_event_loop().run_until_complete(benchmark(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,56 @@
+import atexit
 import logging
 import sys
-from pathlib import Path
+import time
 
 import aiohttp
 import discord
 from discord.ext import commands
-
-from bot.utils import aliases, config, servers, user_action_log
+from discord.ext.commands.view import StringView
+
+from bot.utils import (
+    aliases,
+    audit_writer,
+    config,
+    permissions,
+    rcon_pool,
+    servers,
+    startup,
+    user_action_log,
+    watcher,
+)
+from bot.utils.batch import BatchStep, split_arguments
+from bot.utils.context import PavlovContext
+from bot.utils.logs import LogWriter
+from bot.utils.metrics import command_duration, command_errors, metrics
+from bot.utils.pavlov import server_status
 
 logger = logging.getLogger()
-handler = logging.StreamHandler(sys.stdout)
 formatter = logging.Formatter("%(asctime)s %(name)-12s %(levelname)-8s %(message)s")
-handler.setFormatter(formatter)
-logger.addHandler(handler)
+# records are written by a thread, a slow stdout must not hold up the event loop
+log_writer = LogWriter(sys.stdout, formatter)
+log_writer.start()
+atexit.register(log_writer.stop)
+# audit entries have their own thread, they never wait for stdout
+audit_writer.start()
+atexit.register(audit_writer.stop)
+logger.addHandler(log_writer.handler)
 logger.setLevel(logging.INFO)
 
 __version__ = "0.3.0"
 
+# cogs loaded at startup, in this order
+COGS = [
+    "bot.cogs.help",
+    "bot.cogs.utility",
+    "bot.cogs.pavlov",
+    "bot.cogs.pavlov_captain",
+    "bot.cogs.pavlov_mod",
+    "bot.cogs.pavlov_admin",
+    "bot.cogs.teams",
+    "bot.cogs.commands",
+]
+
 invite_link = "https://discordapp.com/api/oauth2/authorize?client_id={}&scope=bot&permissions=8192"
 
 
@@ -27,9 +61,35 @@ async def get_prefix(_bot, message):
     return commands.when_mentioned_or(prefix)(_bot, message)
 
 
-bot = commands.AutoShardedBot(command_prefix=get_prefix, case_insensitive=True)
+class PavlovBot(commands.AutoShardedBot):
+    async def get_context(self, message, *, cls=PavlovContext):
+        return await super().get_context(message, cls=cls)
+
+    async def invoke(self, ctx):
+        """Commands given a server group instead of a server run as a batch over the group."""
+        batch = self.get_command("batch")
+        if ctx.command is not None and batch is not None and ctx.command is not batch:
+            try:
+                arguments = split_arguments(ctx.view.buffer[ctx.view.index :])
+            except commands.ArgumentParsingError:
+                arguments = []  # the command itself reports the broken quotes
+            step = BatchStep(0, ctx.command.name, arguments, ctx.command)
+            if (
+                step.server_name
+                and not step.accepts_groups
+                and servers.get_group(step.server_name) is not None
+            ):
+                # handed over already split, quoted arguments would not survive parsing again
+                ctx.command = batch
+                ctx.batch_steps = [step]
+                ctx.view = StringView("")
+        await super().invoke(ctx)
+
+
+bot = PavlovBot(command_prefix=get_prefix, case_insensitive=True)
 bot.version = __version__
 bot.remove_command("help")
+permissions.listen(bot)
 
 
 @bot.event
@@ -37,6 +97,15 @@ async def on_ready():
     bot.invite = invite_link.format(bot.user.id)
     bot.aiohttp = aiohttp.ClientSession()
     await bot.change_presence(activity=discord.Game(f"v{__version__}"))
+    rcon_pool.start()
+    bot.loop.create_task(rcon_pool.warm(servers.get_names()))
+    server_status.start(config.status_poll_interval)
+    watcher.start()
+    bot.loop.create_task(metrics.start(config.metrics_port))
+    if not startup.reported:
+        startup.mark("gateway")
+        startup.reported = True
+        logging.info(f"STARTUP: ready after {startup.report()}")
     logging.info(
         f"""Logged in as {bot.user}..
         Serving {len(bot.users)} users in {len(bot.guilds)} guilds
@@ -47,6 +116,7 @@ async def on_ready():
 
 @bot.event
 async def on_command_error(ctx, error):
+    command_errors.inc(type(getattr(error, "original", error)).__name__)
     embed = discord.Embed()
     if isinstance(error, commands.MissingRequiredArgument):
         embed.description = (
@@ -69,20 +139,26 @@ async def on_command_error(ctx, error):
             raise error
     else:
         raise error
-    await ctx.send(embed=embed)
+    await ctx.send(embed=embed, coalesce=False)
 
 
 @bot.before_invoke
 async def before_invoke(ctx):
     ctx.batch_exec = False
-    await ctx.trigger_typing()
-    user_action_log(ctx, f"INVOKED {ctx.command.name.upper():<10} args: {ctx.args[2:]}")
+    ctx.invoked_at = time.monotonic()
+    ctx.start_typing(config.typing_delay)
+    args = ctx.args[2:] or [step.args for step in ctx.batch_steps or []]
+    user_action_log(ctx, f"INVOKED {ctx.command.name.upper():<10} args: {args}")
+
+
+@bot.after_invoke
+async def after_invoke(ctx):
+    ctx.finish()
+    command_duration.observe(time.monotonic() - ctx.invoked_at, ctx.command.qualified_name)
 
 
 def extensions():
-    files = Path("bot", "cogs").rglob("*.py")
-    for file in files:
-        yield file.as_posix()[:-3].replace("/", ".")
+    yield from COGS
 
 
 def load_extensions(_bot):
@@ -93,6 +169,11 @@ def load_extensions(_bot):
             logging.error(f"Failed to load extension {ext} - exception: {ex}")
 
 
-def run():
+def run(started: float = None):
+    """`started` is the `time.perf_counter()` at process start, to time the imports."""
+    if started is not None:
+        startup.started_at(started)
+    startup.mark("modules")
     load_extensions(bot)
+    startup.mark("cogs")
     bot.run(config.token)
@@ -3,9 +3,11 @@ import logging
 import discord
 from discord.ext import commands
 
+from bot.utils import watcher
 from bot.utils.commands import Commands
 
 server_commands = Commands()
+watcher.watch(server_commands)
 
 
 class Commands(commands.Cog):
@@ -19,9 +21,14 @@ class Commands(commands.Cog):
     @commands.command()
     async def command(self, ctx, command_name: str):
         """`{prefix}command <command_name>`"""
-        command = server_commands.get(command_name)
+        try:
+            command = server_commands.get(command_name)
+        except server_commands.NotFoundError:
+            await ctx.send(
+                embed=discord.Embed(description=f"⚠️ Command `{command_name}` not found.")
+            )
+            return
         await command(ctx)
-        await ctx.send(f"Execution of command `{command_name}` done.")
 
 
 def setup(bot):
@@ -1,8 +1,5 @@
+import asyncio
 import logging
-import re
-import sys
-import traceback
-from asyncio.exceptions import TimeoutError
 from datetime import datetime
 
 import aiohttp
@@ -10,10 +7,14 @@ import discord
 from discord.ext import commands
 
 from bot.utils import Paginator, aliases, servers
-from bot.utils.pavlov import exec_server_command
+from bot.utils.aliases import AliasNotFoundError
+from bot.utils.audit import parse_since
+from bot.utils.batch import BATCH_STEPS_PER_EMBED, plan_batch, run_batch
+from bot.utils.live_embed import LiveEmbed
+from bot.utils.pavlov import exec_server_command, fan_out, first_result, player_index, sessions
 from bot.utils.steamplayer import SteamPlayer
 from bot.utils.text_to_image import text_to_image
-from bs4 import BeautifulSoup
+from bot.utils.workshop import WorkshopCache
 
 # Admin – GiveItem, GiveCash, GiveTeamCash, SetPlayerSkin
 # Mod – Ban, Kick, Unban, RotateMap, SwitchTeam
@@ -26,6 +27,37 @@ ANYONEPLAYING_ROW_FORMAT = (
     "{alias:^15} | {server_name:^36.36} | {map_name:^36.36} "
     "| {map_alias:^15} | {player_count:^6}"
 )
+ANYONEPLAYING_TIMEOUT = 10  # seconds, for all servers together
+BATCH_PENDING = "running.."
+PAGINATE_LIST_LINES = 20  # longer ban and item lists are paginated
+SEEN_SESSIONS = 5  # most recent sessions listed by ;seen
+HISTORY_PAGE_LINES = 15
+HISTORY_MAX_SESSIONS = 300  # listed by ;history at most, the newest ones
+HISTORY_BATCH_SESSIONS = 5  # listed by ;history in a batch, the others are only counted
+WHEREIS_MAX_AGE = 60  # seconds a player index entry is trusted before all servers are asked
+WHEREIS_TIMEOUT = 10  # seconds, for all servers together
+
+# maximum age in seconds of a status snapshot that read commands accept instead of asking live
+SERVERINFO_MAX_AGE = 10
+PLAYERS_MAX_AGE = 10
+MAPLIST_MAX_AGE = 60
+ANYONEPLAYING_MAX_AGE = 30
+
+
+def format_time(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M")
+
+
+def format_duration(seconds: float) -> str:
+    minutes = int(seconds // 60)
+    return f"{minutes // 60}h {minutes % 60:02d}m" if minutes >= 60 else f"{minutes}m"
+
+
+def session_line(session, with_server: bool = True) -> str:
+    """when, for how long and where a player played"""
+    until = "playing now" if session.online else f"for {format_duration(session.duration)}"
+    line = f"`{format_time(session.joined)}` {until}"
+    return f"{line} on `{session.server}`" if with_server else line
 
 
 async def fetch(session, url):
@@ -39,39 +71,28 @@ async def fetch(session, url):
 class Pavlov(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self._map_aliases = {}
+        self._map_aliases = WorkshopCache()
 
     @commands.Cog.listener()
     async def on_ready(self):
         logging.info(f"{type(self).__name__} Cog ready.")
 
     async def get_map_alias(self, map_label: str) -> [str, str]:
-        if map_label in self._map_aliases:
-            _map = self._map_aliases.get(map_label)
-            return _map.get("name"), _map.get("image")
-        try:
-            map_id = map_label.split("UGC")[1]
-            data = await fetch(
-                self.bot.aiohttp,
-                f"https://steamcommunity.com/sharedfiles/filedetails/?id={map_id}",
-            )
-            soup = BeautifulSoup(data, "html.parser")
-            # url_regex = r"/(\b(https?|ftp|file):\/\/[-A-Z0-9+&Q#\/%?=~_|!:,.;]*[-A-Z0-9+&@#\/%=~_|])/ig"
-            regex = r"(https:\/\/steamuserimages-a\.akamaihd\.net\/ugc\/[A-Z0-9\/]*)"
-            match = re.findall(regex, data)[0]
-            map_image = match
-            map_name = soup.title.string.split("::")[1]
-            self._map_aliases[map_label] = {"name": map_name, "image": map_image}
-            return map_name, map_image
-        except Exception as ex:
-            logging.error(f"Getting map label failed with {ex}")
-        return None, None
+        return await self._map_aliases.get(map_label, lambda url: fetch(self.bot.aiohttp, url))
 
     @commands.command()
-    async def servers(self, ctx):
-        """`{prefix}servers` - *Lists available servers*"""
-        server_names = servers.get_names()
+    async def servers(self, ctx, server_group: str = None):
+        """`{prefix}servers [server_group]` - *Lists available servers and groups*"""
+        server_names = servers.get_names(server_group)
         embed = discord.Embed(title="Servers", description="\n- ".join([""] + server_names))
+        groups = servers.get_groups()
+        if server_group is None and groups:
+            embed.add_field(
+                name="Groups",
+                value="\n".join(
+                    f"`{group}`: {', '.join(names)}" for group, names in groups.items()
+                ),
+            )
         await ctx.send(embed=embed)
 
     @commands.group(invoke_without_command=True, pass_context=True, aliases=["alias"])
@@ -88,8 +109,11 @@ class Pavlov(commands.Cog):
         maps = aliases.get_maps()
         paginator = Paginator(max_lines=20)
         if maps:
-            for alias, label in maps.items():
-                paginator.add_line(f"{alias:<15} - {label}")
+            paginator.add_source(
+                maps.items(),
+                lambda alias: f"{alias[0]:<15} - {alias[1]}",
+                page_count=-(-len(maps) // paginator.max_lines),
+            )
             await paginator.create(ctx, embed=embed)
         else:
             embed.description = "No aliases exist for maps."
@@ -102,8 +126,11 @@ class Pavlov(commands.Cog):
         players = aliases.get_players()
         paginator = Paginator(max_lines=20)
         if players:
-            for alias, unique_id in players.items():
-                paginator.add_line(f"{alias:<15} <{unique_id}>")
+            paginator.add_source(
+                players.items(),
+                lambda alias: f"{alias[0]:<15} <{alias[1]}>",
+                page_count=-(-len(players) // paginator.max_lines),
+            )
             await paginator.create(ctx, embed=embed)
         else:
             embed.description = "No player aliases found."
@@ -121,7 +148,9 @@ class Pavlov(commands.Cog):
 
         **Example**: `{prefix}serverinfo rush`
         """
-        data = await exec_server_command(ctx, server_name, "ServerInfo")
+        data = await exec_server_command(
+            ctx, server_name, "ServerInfo", max_age=SERVERINFO_MAX_AGE
+        )
         server_info = data.get("ServerInfo")
         map_label = server_info.get("MapLabel")
         map_name, map_image = await self.get_map_alias(map_label)
@@ -165,6 +194,11 @@ class Pavlov(commands.Cog):
         embed = discord.Embed(description=f"**Blacklisted players** on `{server_name}`:\n")
         if len(black_list) == 0:
             embed.description = f"Currently no Blacklisted players on `{server_name}`"
+        if not ctx.batch_exec and len(black_list) > PAGINATE_LIST_LINES:
+            embed.title = f"Blacklisted players on {server_name}"
+            paginator = Paginator(prefix="", suffix="", max_lines=PAGINATE_LIST_LINES)
+            paginator.add_source(black_list, lambda player: f" - <{str(player)}>")
+            return await paginator.create(ctx, embed=embed)
         for player in black_list:
             embed.description += f"\n - <{str(player)}>"
         if ctx.batch_exec:
@@ -182,6 +216,11 @@ class Pavlov(commands.Cog):
         embed = discord.Embed(description=f"Items available:\n")
         if len(item_list) == 0:
             embed.description = f"Currently no Items available"
+        if not ctx.batch_exec and len(item_list) > PAGINATE_LIST_LINES:
+            embed.title = "Items available"
+            paginator = Paginator(prefix="", suffix="", max_lines=PAGINATE_LIST_LINES)
+            paginator.add_source(item_list, lambda item: f" - <{str(item)}>")
+            return await paginator.create(ctx, embed=embed)
         for item in item_list:
             embed.description += f"\n - <{str(item)}>"
         if ctx.batch_exec:
@@ -194,7 +233,7 @@ class Pavlov(commands.Cog):
 
         **Example**: `{prefix}maplist rush`
         """
-        data = await exec_server_command(ctx, server_name, "MapList")
+        data = await exec_server_command(ctx, server_name, "MapList", max_age=MAPLIST_MAX_AGE)
         map_list = data.get("MapList")
         embed = discord.Embed(description=f"**Active maps** on `{server_name}`:\n")
         if len(map_list) == 0:
@@ -211,7 +250,9 @@ class Pavlov(commands.Cog):
 
         **Example**: `{prefix}players rush`
         """
-        data = await exec_server_command(ctx, server_name, "RefreshList")
+        data = await exec_server_command(
+            ctx, server_name, "RefreshList", max_age=PLAYERS_MAX_AGE
+        )
         player_list = data.get("PlayerList")
         embed = discord.Embed(description=f"**Active players** on `{server_name}`:\n")
         if len(player_list) == 0:
@@ -248,42 +289,177 @@ class Pavlov(commands.Cog):
                 embed.add_field(name="Alias", value=player.name)
         await ctx.send(embed=embed)
 
+    async def _find_player(self, ctx, server_name: str, unique_id: str):
+        data = await exec_server_command(ctx, server_name, "RefreshList", max_age=PLAYERS_MAX_AGE)
+        for player in data.get("PlayerList") or []:
+            if str(player.get("UniqueId")) == unique_id:
+                return player.get("Username") or ""
+        return None
+
+    @commands.command()
+    async def whereis(self, ctx, player_arg: str):
+        """`{prefix}whereis <player_id|alias>` - *Finds the server a player is on*
+
+        **Example**: `{prefix}whereis 89374583439127`
+        """
+        player = SteamPlayer.convert(player_arg)
+        unique_id = str(player.unique_id)
+        sighting = player_index.get(unique_id)
+        if sighting is not None and sighting.online and sighting.age <= WHEREIS_MAX_AGE:
+            found = sighting.server_name, sighting.username
+        else:
+            found = await first_result(
+                servers.get_names(),
+                lambda server_name: self._find_player(ctx, server_name, unique_id),
+                timeout=WHEREIS_TIMEOUT,
+            )
+        if found is not None:
+            server_name, username = found
+            description = f"`{username or player.name}` <{unique_id}> is on `{server_name}`"
+        else:
+            description = f"`{player.name}` <{unique_id}> is not on any server"
+            sighting = player_index.get(unique_id)
+            if sighting is not None:
+                description += f", last seen on `{sighting.server_name}`"
+                description += f" at {format_time(sighting.seen)}"
+        if ctx.batch_exec:
+            return description
+        await ctx.send(embed=discord.Embed(description=description))
+
+    @commands.command()
+    async def seen(self, ctx, player_arg: str):
+        """`{prefix}seen <player_id|alias|name>` - *When and where a player played last*
+
+        **Example**: `{prefix}seen 89374583439127`
+        """
+        try:
+            player = SteamPlayer.convert(player_arg)
+            history = await sessions.player(player.unique_id, limit=SEEN_SESSIONS)
+        except AliasNotFoundError:
+            player = None
+            history = await sessions.username(player_arg, limit=SEEN_SESSIONS)
+        name = player.name if player else player_arg
+        if not history:
+            embed = discord.Embed(description=f"`{name}` has not been seen on any server.")
+        else:
+            last = history[0]
+            if last.online:
+                description = f"`{last.username}` is playing on `{last.server}`"
+            else:
+                description = f"`{last.username}` was last seen on `{last.server}`"
+                description += f" at {format_time(last.left)}"
+            embed = discord.Embed(description=f"{description} <{last.unique_id}>")
+            embed.add_field(
+                name="Recent sessions",
+                value="\n".join(session_line(session) for session in history),
+                inline=False,
+            )
+        if ctx.batch_exec:
+            return embed.description
+        await ctx.send(embed=embed)
+
+    @commands.command()
+    async def history(self, ctx, server_name: str, since: str = None):
+        """`{prefix}history <server_name> [since]` - *Who played on a server*
+
+        **Example**: `{prefix}history rush 12h`
+        """
+        server_name = servers.get_name(server_name)  # raises ServerNotFoundError if unknown
+        try:
+            since_time = parse_since(since) if since else 0
+        except ValueError as ex:
+            return await ctx.send(embed=discord.Embed(description=f"⚠️ {ex}"))
+        history = await sessions.server(server_name, since_time, HISTORY_MAX_SESSIONS + 1)
+        truncated = history[HISTORY_MAX_SESSIONS:]
+        history = history[:HISTORY_MAX_SESSIONS]
+        title = f"Players on {server_name}" + (f" since {since}" if since else "")
+        embed = discord.Embed(title=title)
+        if ctx.batch_exec:
+            # one embed field in the batch embed, which must stay short
+            if not history:
+                return "No players recorded."
+            lines = [
+                f"{session.username} <{session.unique_id}> {session_line(session, False)}"
+                for session in history[:HISTORY_BATCH_SESSIONS]
+            ]
+            more = len(history) - HISTORY_BATCH_SESSIONS
+            if more > 0:
+                lines.append(f"…and {more}{'+' if truncated else ''} more")
+            return "\n".join(lines)
+        if not history:
+            embed.description = "No players recorded."
+            return await ctx.send(embed=embed)
+        paginator = Paginator(prefix="", suffix="", max_lines=HISTORY_PAGE_LINES)
+        paginator.add_source(
+            history,
+            lambda session: f"**{session.username}** <{session.unique_id}> "
+            f"{session_line(session, False)}",
+        )
+        footer_text = ""
+        if truncated:
+            footer_text = f"Only the newest {HISTORY_MAX_SESSIONS} sessions are listed | "
+        await paginator.create(ctx, embed=embed, footer_text=footer_text)
+
     @commands.command()
     async def batch(self, ctx, *batch_commands):
         """`{prefix}batch "<command with arguments>" "<command with args>"`
 
+        Commands for different servers run in parallel, `wait` waits for all previous ones.
+        A command for a server group runs on each of its servers.
         **Example**: `{prefix}batch "rotatemap rush" "serverinfo rush"`
         """
-        embed = discord.Embed(title="batch execute")
         before = datetime.now()
-        for args in batch_commands:
-            _args = args.split(" ")
-            cmd = _args[0]
-            command = self.bot.all_commands.get(cmd.lower())
-            ctx.batch_exec = True
-            if command:
-                # await ctx.send(f"batch execute: `{args}`.. ")
-                try:
-                    # await ctx.trigger_typing()
-                    data = await command(ctx, *_args[1:])
-                    if data is None:
-                        embed.add_field(
-                            name=args,
-                            value="Command failed due to lack of permissions.",
-                            inline=False,
-                        )
-                    else:
-                        embed.add_field(name=args, value=data, inline=False)
-                except Exception as ex:
-                    logging.error(f"BATCH: {command} failed with {ex}")
-                    traceback.print_exc(file=sys.stdout)
-                    embed.add_field(name=args, value="execution failed", inline=False)
-            else:
-                embed.add_field(
-                    name=args, value="execution failed - command not found", inline=False,
-                )
-        embed.set_footer(text=f"Execution time: {datetime.now() - before}")
-        await ctx.send(embed=embed)
+        ctx.batch_exec = True
+        stages = plan_batch(self.bot, ctx.batch_steps or batch_commands, servers.get_group)
+        steps = [step for stage in stages for step in stage]
+        # large batches, e.g. on all servers, are spread over several messages
+        live_embeds = list()
+        for start in range(0, max(len(steps), 1), BATCH_STEPS_PER_EMBED):
+            embed = discord.Embed()
+            for step in steps[start : start + BATCH_STEPS_PER_EMBED]:
+                name, value = step.field(BATCH_PENDING)
+                embed.add_field(name=name, value=value, inline=False)
+            live_embeds.append(LiveEmbed(embed))
+        live_embeds[0].embed.title = "batch execute"
+        for live_embed in live_embeds:
+            await live_embed.send(ctx)
+
+        def on_step_done(step):
+            live_embed = live_embeds[step.index // BATCH_STEPS_PER_EMBED]
+            name, value = step.field(step.result)
+            live_embed.embed.set_field_at(
+                step.index % BATCH_STEPS_PER_EMBED, name=name, value=value, inline=False
+            )
+            live_embed.changed()
+
+        try:
+            await run_batch(ctx, stages, on_step_done)
+        finally:
+            live_embeds[-1].embed.set_footer(text=f"Execution time: {datetime.now() - before}")
+            for live_embed in live_embeds:
+                await live_embed.close()
+
+    async def _anyoneplaying_row(self, ctx, server_alias: str) -> str:
+        data = await exec_server_command(
+            ctx, server_alias, "ServerInfo", max_age=ANYONEPLAYING_MAX_AGE
+        )
+        server_info = data.get("ServerInfo", {})
+        players_count = server_info.get("PlayerCount", "0/0")
+        server_name = server_info.get("ServerName", "")
+        map_label = server_info.get("MapLabel")
+        map_name, _ = await self.get_map_alias(map_label)
+        map_alias = aliases.find_map_alias(map_label)
+        if not map_name:
+            map_name = ""
+        if not map_alias:
+            map_alias = ""
+        return ANYONEPLAYING_ROW_FORMAT.format(
+            alias=server_alias,
+            server_name=server_name,
+            map_name=map_name,
+            map_alias=map_alias,
+            player_count=players_count,
+        )
 
     @commands.command()
     async def anyoneplaying(self, ctx, server_group: str = None):
@@ -297,37 +473,25 @@ class Pavlov(commands.Cog):
             player_count="Players",
         )
         desc = f"\n{players_header}\n{'-'*len(players_header)}\n"
-        for server_alias in servers.get_names(server_group):
-            try:
-                data = await exec_server_command(ctx, server_alias, "ServerInfo")
-                server_info = data.get("ServerInfo", {})
-                players_count = server_info.get("PlayerCount", "0/0")
-                server_name = server_info.get("ServerName", "")
-                map_label = server_info.get("MapLabel")
-                map_name, _ = await self.get_map_alias(map_label)
-                map_alias = aliases.find_map_alias(map_label)
-                if not map_name:
-                    map_name = ""
-                if not map_alias:
-                    map_alias = ""
-                desc += ANYONEPLAYING_ROW_FORMAT.format(
-                    alias=server_alias,
-                    server_name=server_name,
-                    map_name=map_name,
-                    map_alias=map_alias,
-                    player_count=players_count,
-                )
-                desc += "\n"
-            except (ConnectionRefusedError, OSError, TimeoutError):
-                desc += ANYONEPLAYING_ROW_FORMAT.format(
+        rows = await fan_out(
+            servers.get_names(server_group),
+            lambda server_alias: self._anyoneplaying_row(ctx, server_alias),
+            timeout=ANYONEPLAYING_TIMEOUT,
+        )
+        for server_alias, row in rows.items():
+            if isinstance(row, Exception):
+                if not isinstance(row, (OSError, asyncio.TimeoutError)):
+                    logging.error(f"ANYONEPLAYING: {server_alias} failed with {row!r}")
+                row = ANYONEPLAYING_ROW_FORMAT.format(
                     alias=server_alias,
                     server_name="SERVER UNAVAILABLE",
                     map_name="N/A",
                     map_alias="N/A",
                     player_count="N/A",
                 )
-                desc += "\n"
-        file = text_to_image(desc, "anyoneplaying.png")
+            desc += row
+            desc += "\n"
+        file = await text_to_image(desc, "anyoneplaying.png")
         await ctx.send(file=file)
 
 
@@ -4,13 +4,21 @@ from datetime import datetime
 
 import discord
 from discord.ext import commands
+from discord.ext.commands import ArgumentParsingError
 
-from bot.utils import SteamPlayer, aliases
+from bot.utils import SteamPlayer, aliases, servers
+from bot.utils.batch import split_arguments
+from bot.utils.live_embed import LiveEmbed
 from bot.utils.pavlov import check_perm_captain, exec_server_command
+from bot.utils.rcon import AdaptivePacer
 
 
 MATCH_DELAY_RESETSND = 10
-RCON_COMMAND_PAUSE = 100 / 1000  # milliseconds
+
+
+class MatchSetupError(Exception):
+    def __init__(self, reason: str):
+        self.reason = reason
 
 
 class PavlovCaptain(commands.Cog):
@@ -111,6 +119,16 @@ class PavlovCaptain(commands.Cog):
             embed = discord.Embed(description=f"Rotated map successfully")
         await ctx.send(embed=embed)
 
+    async def _switch_teams(self, ctx, teams, server_name: str, on_progress=None):
+        pacer = AdaptivePacer()
+        members = [(index, member) for index, team in enumerate(teams) for member in team.members]
+        for count, (index, member) in enumerate(members, start=1):
+            await pacer.run(
+                exec_server_command(ctx, server_name, f"SwitchTeam {member.unique_id} {index}")
+            )
+            if on_progress:
+                on_progress(f"Switched {count}/{len(members)} players")
+
     @commands.command()
     async def matchsetup(
         self, ctx, team_a_name: str, team_b_name: str, server_name: str
@@ -131,12 +149,7 @@ class PavlovCaptain(commands.Cog):
             )
         await ctx.send(embed=embed)
 
-        for index, team in enumerate(teams):
-            for member in team.members:
-                await exec_server_command(
-                    ctx, server_name, f"SwitchTeam {member.unique_id} {index}"
-                )
-                await asyncio.sleep(RCON_COMMAND_PAUSE)
+        await self._switch_teams(ctx, teams, server_name)
 
         await ctx.send(
             embed=discord.Embed(
@@ -149,6 +162,85 @@ class PavlovCaptain(commands.Cog):
         embed.set_footer(text=f"Execution time: {datetime.now() - before}")
         await ctx.send(embed=embed)
 
+    async def _prepare_match(self, ctx, match: str, used_servers: set):
+        try:
+            args = split_arguments(match)
+        except ArgumentParsingError:
+            raise MatchSetupError("unbalanced quotes")
+        if len(args) != 3:
+            raise MatchSetupError("expected `<CT team> <T team> <server>`")
+        team_a_name, team_b_name, server_name = args
+        if server_name.lower() in used_servers:
+            raise MatchSetupError(f"`{server_name}` is already used by another match")
+        try:
+            if not await check_perm_captain(ctx, server_name):
+                raise MatchSetupError("lack of permissions")
+            teams = [aliases.get_team(team_a_name), aliases.get_team(team_b_name)]
+        except servers.ServerNotFoundError as ex:
+            raise MatchSetupError(f"server `{ex.server_name}` not found")
+        except aliases.AliasNotFoundError as ex:
+            raise MatchSetupError(f"team `{ex.alias}` not found")
+        used_servers.add(server_name.lower())
+        return teams, server_name
+
+    async def _run_match(self, ctx, teams, server_name: str, on_progress):
+        try:
+            await self._switch_teams(ctx, teams, server_name, on_progress)
+            on_progress(f"Teams set up. Resetting SND in {MATCH_DELAY_RESETSND} seconds.")
+            await asyncio.sleep(MATCH_DELAY_RESETSND)
+            await exec_server_command(ctx, server_name, "ResetSND")
+        except (ConnectionRefusedError, OSError, asyncio.TimeoutError) as ex:
+            logging.error(f"TOURNAMENT: setup on {server_name} failed with {ex!r}")
+            on_progress("**Failed** to reach the server.")
+        except Exception as ex:
+            # one failed match must not leave the others running unobserved
+            logging.exception(f"TOURNAMENT: setup on {server_name} failed with {ex!r}")
+            on_progress(f"**Failed** with {type(ex).__name__}.")
+        else:
+            on_progress("Reset SND. Good luck!")
+
+    @commands.command()
+    async def tournament(self, ctx, *matches):
+        """`{prefix}tournament "<CT team> <T team> <server>" "<CT team> <T team> <server>"`
+
+        Sets up all matches at the same time, each on its own server.
+        **Requires**: Captain permissions or higher for the servers
+        **Example**: `{prefix}tournament "team_a team_b rush" "team_c team_d snd1"`
+        """
+        before = datetime.now()
+        ctx.batch_exec = True  # permission failures are reported in the progress embed
+        embed = discord.Embed(title="Tournament setup")
+        used_servers = set()
+        runs = list()
+        for index, match in enumerate(matches):
+            try:
+                teams, server_name = await self._prepare_match(ctx, match, used_servers)
+            except MatchSetupError as ex:
+                embed.add_field(name=match, value=f"**Skipped**: {ex.reason}", inline=False)
+                continue
+            embed.add_field(name=match, value="Switching teams..", inline=False)
+            runs.append((index, match, teams, server_name))
+        live_embed = LiveEmbed(embed)
+        await live_embed.send(ctx)
+
+        def progress(index: int, match: str):
+            def on_progress(status: str):
+                embed.set_field_at(index, name=match, value=status, inline=False)
+                live_embed.changed()
+
+            return on_progress
+
+        try:
+            await asyncio.gather(
+                *[
+                    self._run_match(ctx, teams, server_name, progress(index, match))
+                    for index, match, teams, server_name in runs
+                ]
+            )
+        finally:
+            embed.set_footer(text=f"Execution time: {datetime.now() - before}")
+            await live_embed.close()
+
 
 def setup(bot):
     bot.add_cog(PavlovCaptain(bot))
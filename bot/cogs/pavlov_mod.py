@@ -5,8 +5,12 @@ from datetime import datetime
 import discord
 from discord.ext import commands
 
-from bot.utils import SteamPlayer
-from bot.utils.pavlov import check_perm_moderator, exec_server_command
+from bot.utils import SteamPlayer, servers, user_action_log
+from bot.utils.batch import accepts_groups
+from bot.utils.pavlov import check_perm_moderator, exec_server_command, fan_out
+
+# past tense of the moderation commands which can run on server groups
+GROUP_ACTIONS = {"Ban": "banned", "Kick": "kicked", "Unban": "unbanned"}
 
 
 class PavlovMod(commands.Cog):
@@ -17,13 +21,78 @@ class PavlovMod(commands.Cog):
     async def on_ready(self):
         logging.info(f"{type(self).__name__} Cog ready.")
 
+    async def _moderate_group(self, ctx, action: str, player_arg: str, server_group: str):
+        """Runs `action` on every server of the group the author may moderate, concurrently.
+
+        The outcome for all servers is summarised in one embed.
+        """
+        player = SteamPlayer.convert(player_arg)
+        server_names = servers.get_names(server_group)
+        permitted = [
+            name
+            for name in server_names
+            if await check_perm_moderator(ctx, name, sub_check=True)
+        ]
+        for name in server_names:
+            if name not in permitted:
+                user_action_log(
+                    ctx,
+                    f"MOD CHECK FAILED group={server_group}",
+                    log_level=logging.WARNING,
+                    server_name=name,
+                )
+        if not permitted:
+            if not ctx.batch_exec:
+                embed = discord.Embed(description="This command is only for Moderators and above.")
+                await ctx.send(embed=embed)
+            return
+        results = await fan_out(
+            permitted,
+            lambda name: exec_server_command(ctx, name, f"{action} {player.unique_id}"),
+        )
+        outcomes = {"succeeded": [], "failed": [], "timed out": [], "no permission": []}
+        for name, data in results.items():
+            if isinstance(data, (asyncio.TimeoutError, TimeoutError)):
+                outcome = "timed out"
+                outcomes[outcome].append(name)
+            elif isinstance(data, Exception):
+                outcome = "failed"
+                outcomes[outcome].append(f"{name} ({type(data).__name__})")
+            elif isinstance(data, dict) and data.get(action):
+                outcome = "succeeded"
+                outcomes[outcome].append(name)
+            else:
+                # refused, or a reply that was cut off
+                outcome = "failed"
+                outcomes[outcome].append(name)
+            # one audit entry per server, so `;audit <server>` shows group actions as well
+            user_action_log(
+                ctx, f"{action.upper()} {player.unique_id} {outcome}", server_name=name
+            )
+        outcomes["no permission"] = [name for name in server_names if name not in permitted]
+        embed = discord.Embed(
+            description=f"<{player.unique_id}> {GROUP_ACTIONS[action]} on "
+            f"{len(outcomes['succeeded'])} of {len(server_names)} servers of `{server_group}`"
+        )
+        for outcome, names in outcomes.items():
+            if names:
+                embed.add_field(name=outcome.capitalize(), value=", ".join(names), inline=False)
+        if ctx.batch_exec:
+            return "\n".join(
+                [embed.description] + [f"{field.name}: {field.value}" for field in embed.fields]
+            )
+        await ctx.send(embed=embed)
+
     @commands.command()
+    @accepts_groups
     async def ban(self, ctx, player_arg: str, server_name: str):
-        """`{prefix}ban <player_id> <server_name>`
+        """`{prefix}ban <player_id> <server_name|server_group|all>`
 
         **Requires**: Moderator permissions or higher for the server
         **Example**: `{prefix}ban 89374583439127 rush`
         """
+        if servers.get_group(server_name) is not None:
+            return await self._moderate_group(ctx, "Ban", player_arg, server_name)
         if not await check_perm_moderator(ctx, server_name):
             return
         player = SteamPlayer.convert(player_arg)
@@ -64,12 +133,15 @@ class PavlovMod(commands.Cog):
         await ctx.send(embed=embed)
 
     @commands.command()
+    @accepts_groups
     async def kick(self, ctx, player_arg: str, server_name: str):
-        """`{prefix}kick <player_id> <server_name>`
+        """`{prefix}kick <player_id> <server_name|server_group|all>`
 
         **Requires**: Moderator permissions or higher for the server
         **Example**: `{prefix}kick 89374583439127 rush`
         """
+        if servers.get_group(server_name) is not None:
+            return await self._moderate_group(ctx, "Kick", player_arg, server_name)
         if not await check_perm_moderator(ctx, server_name):
             return
         player = SteamPlayer.convert(player_arg)
@@ -88,12 +160,15 @@ class PavlovMod(commands.Cog):
         await ctx.send(embed=embed)
 
     @commands.command()
+    @accepts_groups
     async def unban(self, ctx, player_arg: str, server_name: str):
-        """`{prefix}unban <player_id> <server_name>`
+        """`{prefix}unban <player_id> <server_name|server_group|all>`
 
         **Requires**: Moderator permissions or higher for the server
         **Example**: `{prefix}unban 89374583439127 rush`
         """
+        if servers.get_group(server_name) is not None:
+            return await self._moderate_group(ctx, "Unban", player_arg, server_name)
         if not await check_perm_moderator(ctx, server_name):
             return
         player = SteamPlayer.convert(player_arg)
@@ -1,4 +1,5 @@
 import logging
+import re
 import sys
 import time
 from datetime import datetime
@@ -6,9 +7,35 @@ from datetime import datetime
 import discord
 from discord.ext import commands
 
+from bot.utils import Paginator, audit_log, servers
+from bot.utils.audit import parse_since
+from bot.utils.metrics import (
+    command_duration,
+    command_errors,
+    rcon_errors,
+    rcon_rtt,
+    workshop_cache,
+)
+from bot.utils.pavlov import check_perm_admin
+
 PY_VERSION = (
     f"{sys.version_info.major}.{sys.version_info.minor}.{sys.version_info.micro}"
 )
+STATS_MAX_ROWS = 10
+AUDIT_PAGE_LINES = 10
+
+MENTION_PATTERN = re.compile(r"^<@!?(\d+)>$")
+
+
+def latency_rows(histogram, label_width: int = 15):
+    """count, mean and p95 per label, most frequent first"""
+    rows = list()
+    values = sorted(histogram.values.items(), key=lambda item: -item[1].count)
+    for labels, value in values[:STATS_MAX_ROWS]:
+        mean = value.sum / value.count * 1000
+        p95 = histogram.quantile(0.95, *labels) * 1000
+        rows.append(f"{labels[0]:<{label_width}} {value.count:>6} {mean:>7.0f}ms {p95:>7.0f}ms")
+    return rows
 
 
 class Utility(commands.Cog):
@@ -25,7 +52,7 @@ class Utility(commands.Cog):
         """`{prefix}ping` - *Current ping and latency of the bot*"""
         embed = discord.Embed()
         before_time = time.time()
-        msg = await ctx.send(embed=embed)
+        msg = await ctx.send(embed=embed, coalesce=False)
         latency = round(self.bot.latency * 1000)
         elapsed_ms = round((time.time() - before_time) * 1000) - latency
         embed.add_field(name="ping", value=f"{elapsed_ms}ms")
@@ -72,6 +99,81 @@ class Utility(commands.Cog):
         )
         await ctx.send(embed=embed)
 
+    @commands.command()
+    async def stats(self, ctx):
+        """`{prefix}stats` - *Command, RCON and cache statistics since the bot started*"""
+        if not await check_perm_admin(ctx, global_check=True):
+            return
+        embed = discord.Embed(title="Bot statistics")
+        header = f"{'':<15} {'count':>6} {'mean':>9} {'p95 <=':>9}"
+        rows = latency_rows(command_duration)
+        if rows:
+            embed.add_field(
+                name="Commands", value="```\n" + "\n".join([header] + rows) + "```", inline=False
+            )
+        rows = latency_rows(rcon_rtt)
+        if rows:
+            embed.add_field(
+                name="RCON round-trip time",
+                value="```\n" + "\n".join([header] + rows) + "```",
+                inline=False,
+            )
+        errors = [
+            f"{error}: {count}" for (error,), count in sorted(command_errors.values.items())
+        ]
+        errors += [
+            f"{server} {error}: {count}"
+            for (server, error), count in sorted(rcon_errors.values.items())
+        ]
+        embed.add_field(
+            name="Errors",
+            value="```\n" + "\n".join(errors[:STATS_MAX_ROWS] or ["none"]) + "```",
+            inline=False,
+        )
+        lookups = workshop_cache.total()
+        if lookups:
+            hits = workshop_cache.values.get(("hit",), 0)
+            hits += workshop_cache.values.get(("negative_hit",), 0)
+            embed.add_field(
+                name="Workshop cache", value=f"{hits / lookups:.0%} hits of {lookups:.0f} lookups"
+            )
+        await ctx.send(embed=embed)
+
+    @commands.command()
+    async def audit(self, ctx, target: str, since: str = None):
+        """`{prefix}audit <user|server> [since]` - *Recent actions of a user or on a server*
+
+        **Example**: `{prefix}audit @user 7d`, `{prefix}audit snd1 2021-05-01`
+        """
+        if not await check_perm_admin(ctx, global_check=True):
+            return
+        match = MENTION_PATTERN.match(target)
+        if match or target.isdigit():
+            kind, value = "user", match.group(1) if match else target
+        else:
+            servers.get(target)  # raises ServerNotFoundError for unknown servers
+            kind, value = "server", target
+        try:
+            since_time = parse_since(since) if since else 0
+        except ValueError as ex:
+            return await ctx.send(embed=discord.Embed(description=f"⚠️ {ex}"))
+        entries = await self.bot.loop.run_in_executor(
+            None, audit_log.query, kind, value, since_time
+        )
+        embed = discord.Embed(title=f"Audit log of {target}" + (f" since {since}" if since else ""))
+        if not entries:
+            embed.description = "No actions recorded."
+            return await ctx.send(embed=embed)
+
+        def line(entry):
+            when = datetime.fromtimestamp(entry["time"]).strftime("%Y-%m-%d %H:%M")
+            who = (entry["server"] or "-") if kind == "user" else entry["user"]
+            return f"`{when}` **{who}** {entry['message']}"
+
+        paginator = Paginator(prefix="", suffix="", max_lines=AUDIT_PAGE_LINES)
+        paginator.add_source(entries, line)
+        await paginator.create(ctx, embed=embed)
+
 
 def setup(bot):
     bot.add_cog(Utility(bot))
@@ -1,20 +1,62 @@
 import logging
+import time
+
+from .startup import startup  # first, so its timer starts before anything is loaded
 
 from .aliases import Aliases
+from .audit import AuditLog, AuditWriter
 from .config import Config
 from .paginator import Paginator
+from .permissions import Permissions
+from .rcon import RconPool
 from .servers import Servers
 from .steamplayer import SteamPlayer
+from .watcher import FileWatcher
 
 config = Config()
 servers = Servers()
 aliases = Aliases()
+rcon_pool = RconPool(servers)
+permissions = Permissions(servers)
+audit_log = AuditLog()
+audit_writer = AuditWriter(audit_log)
 SteamPlayer.set_aliases(aliases)
 aliases.load_teams()
+watcher = FileWatcher()
+watcher.watch(config)
+
+
+async def on_servers_reload():
+    permissions.rebuild()
+    await rcon_pool.sync()
+
+
+watcher.watch(servers, on_reload=on_servers_reload)
+watcher.watch(aliases)
+startup.mark("config")
+
+
+def _server_argument(ctx):
+    if ctx.command is None:
+        return None
+    arguments = dict(zip(ctx.command.clean_params, ctx.args[2:]))
+    server_name = arguments.get("server_name")
+    return server_name if isinstance(server_name, str) else None
 
 
-def user_action_log(ctx, message, log_level=logging.INFO):
+def user_action_log(ctx, message, log_level=logging.INFO, server_name: str = None):
+    """Logs a user action and appends it to the audit log, whatever the logging level."""
     name = f"{ctx.author.name}#{ctx.author.discriminator}"
+    entry = {
+        "time": time.time(),
+        "level": logging.getLevelName(log_level),
+        "user_id": ctx.author.id,
+        "user": name,
+        "command": ctx.command.qualified_name if ctx.command else None,
+        "server": server_name or _server_argument(ctx),
+        "message": message,
+    }
+    audit_writer.write(entry)
     logging.log(log_level, f"USER: {name} <{ctx.author.id}> -- {message}")
 
 
@@ -22,6 +64,12 @@ __all__ = [
     "config",
     "servers",
     "aliases",
+    "rcon_pool",
+    "permissions",
+    "audit_log",
+    "audit_writer",
+    "watcher",
+    "startup",
     "SteamPlayer",
     "Paginator",
     "user_action_log",
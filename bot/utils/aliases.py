@@ -23,6 +23,19 @@ def check_player_already_int(name):
         return False
 
 
+def build_indexes(data: dict):
+    """casefolded name -> alias name and label -> alias names, per alias type"""
+    index = {}
+    reverse_index = {}
+    for alias_type, aliases in data.items():
+        type_index = index.setdefault(alias_type, {})
+        type_reverse_index = reverse_index.setdefault(alias_type, {})
+        for name, label in aliases.items():
+            type_index.setdefault(name.casefold(), name)
+            type_reverse_index.setdefault(str(label), []).append(name)
+    return index, reverse_index
+
+
 class Team:
     def __init__(self, name: str, members: List[SteamPlayer]):
         self.name = name
@@ -33,6 +46,10 @@ class Team:
     def members(self):
         return self._original_members + self._ringers
 
+    @property
+    def ringers(self):
+        return list(self._ringers)
+
     def ringer_add(self, ringer: SteamPlayer):
         self._ringers.append(ringer)
 
@@ -64,37 +81,75 @@ class Aliases:
     def __init__(self, filename="aliases.json"):
         self._filename = filename
         self._aliases = {}
+        self._index = {}
+        self._reverse_index = {}
+        self._team_index = {}
         self.AliasNotFoundError = AliasNotFoundError
         if not os.path.isfile(filename):
             with open(filename, "w") as file:
                 json.dump(DEFAULT_FORMAT, file)
-        with open(filename) as file:
-            data = json.load(file)
-            self._aliases = data
         self.teams = None
+        with open(filename) as file:
+            self.apply(self.parse(json.load(file)))
+
+    @property
+    def filename(self):
+        return self._filename
+
+    @staticmethod
+    def parse(data):
+        """Validates aliases.json data and builds its indexes, raises ValueError if invalid."""
+        if not isinstance(data, dict):
+            raise ValueError("aliases have to be an object of alias type to aliases")
+        for alias_type, aliases in data.items():
+            if not isinstance(aliases, dict):
+                raise ValueError(f"{alias_type} aliases have to be an object")
+        index, reverse_index = build_indexes(data)
+        players = index.get("players", {})
+        for team_name, members in data.get("teams", {}).items():
+            if not isinstance(members, list):
+                raise ValueError(f"members of team {team_name} have to be a list")
+            for member in members:
+                member = str(member)
+                if not check_player_already_int(member) and member.casefold() not in players:
+                    raise ValueError(f"member {member} of team {team_name} is no player alias")
+        return data, index, reverse_index
+
+    def apply(self, parsed):
+        """Swaps in parsed aliases, reloaded teams keep their ringers."""
+        self._aliases, self._index, self._reverse_index = parsed
+        if self.teams is not None:
+            previous_teams = self.teams
+            self.load_teams()
+            for team_name, team in self.teams.items():
+                previous = previous_teams.get(team_name)
+                if previous is not None:
+                    for ringer in previous.ringers:
+                        team.ringer_add(ringer)
 
     def get(self, alias_type: str, name: str):
         data = self._aliases.get(alias_type, {})
         alias = data.get(name)
         if alias is None:
-            for key in data.keys():
-                if key.lower() == name.lower():
-                    alias = data.get(key)
-                    break
-            else:
+            key = self._index.get(alias_type, {}).get(name.casefold())
+            if key is None:
                 raise AliasNotFoundError(alias_type, name)
+            alias = data.get(key)
         return alias
 
     def load_teams(self):
         _teams = self._aliases.get("teams", {})
         teams = {}
+        team_index = {}
         for team_name, members in _teams.items():
             steam_members = list()
             for member in members:
                 steam_members.append(SteamPlayer.convert(member))
             team = Team(name=team_name, members=steam_members)
             teams[team_name] = team
+            team_index.setdefault(team_name.casefold(), team)
         self.teams = teams
+        self._team_index = team_index
 
     def get_map(self, name: str):
         if check_map_already_label(name):
@@ -109,19 +164,15 @@ class Aliases:
     def get_team(self, name: str):
         team = self.teams.get(name)
         if team is None:
-            for team_name, t in self.teams.items():
-                if name.lower() == team_name.lower():
-                    team = t
-                    break
-            else:
+            team = self._team_index.get(name.casefold())
+            if team is None:
                 raise AliasNotFoundError("teams", name)
         return team
 
     def find_alias(self, alias_type: str, search: str):
-        data = self._aliases.get(alias_type, {})
-        for alias, label in data.items():
-            if str(label) == str(search):
-                return alias
+        names = self._reverse_index.get(alias_type, {}).get(str(search))
+        if names:
+            return names[0]
 
     def find_map_alias(self, map_label: str):
         return self.find_alias("maps", map_label)
@@ -0,0 +1,185 @@
+import json
+import logging
+import os
+import queue
+import re
+import sys
+import threading
+import time
+from bisect import bisect_left
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+AUDIT_MAX_BYTES = 10 * 1024 * 1024  # the audit file is rotated when it grows beyond this
+AUDIT_BACKUP_COUNT = 5  # rotated audit files kept, as audit.jsonl.1 (newest) to .5
+AUDIT_QUERY_LIMIT = 100  # entries returned by one query at most
+AUDIT_BATCH_SIZE = 200  # entries appended to the audit file at once
+AUDIT_STOP_TIMEOUT = 5  # seconds to wait for the writer to catch up on exit
+
+SINCE_UNITS = {"m": 60, "h": 3600, "d": 86400, "w": 604800}
+SINCE_PATTERN = re.compile(r"^(\d+)([mhdw])$")
+
+IndexKey = Tuple[str, str]
+
+_STOP = object()
+
+
+class AuditLog:
+    """Append-only JSON lines file of user actions, rotated by size.
+
+    Every file has an index from user id and server name to the (time, offset) of its
+    entries, so queries seek to the matching lines instead of reading whole files.
+    Indexes of existing files are built on the first query and kept up to date by
+    `write`. `write` and `query` block and are meant to run outside the event loop.
+    """
+
+    def __init__(
+        self,
+        filename: str = "audit.jsonl",
+        max_bytes: int = AUDIT_MAX_BYTES,
+        backup_count: int = AUDIT_BACKUP_COUNT,
+    ):
+        self.filename = filename
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self._lock = threading.Lock()
+        # one index per file, the current file first
+        self._indexes: Optional[List[Dict[IndexKey, List[Tuple[float, int]]]]] = None
+        self._size = None
+
+    def _filenames(self) -> List[str]:
+        return [self.filename] + [f"{self.filename}.{n}" for n in range(1, self.backup_count + 1)]
+
+    @staticmethod
+    def keys(entry: dict) -> Iterable[IndexKey]:
+        if entry.get("user_id") is not None:
+            yield "user", str(entry["user_id"])
+        if entry.get("server"):
+            yield "server", entry["server"].casefold()
+
+    @classmethod
+    def _add(cls, index: dict, entry: dict, offset: int):
+        for key in cls.keys(entry):
+            index.setdefault(key, list()).append((entry.get("time", 0), offset))
+
+    def _read_index(self, filename: str) -> dict:
+        index = dict()
+        if not os.path.isfile(filename):
+            return index
+        with open(filename, "rb") as file:
+            offset = 0
+            for line in file:
+                try:
+                    self._add(index, json.loads(line), offset)
+                except ValueError:
+                    logging.warning(f"AUDIT: skipping broken line at {filename}:{offset}")
+                offset += len(line)
+        return index
+
+    def _load(self):
+        if self._indexes is None:
+            self._indexes = [self._read_index(filename) for filename in self._filenames()]
+
+    def _rotate(self):
+        filenames = self._filenames()
+        for source, target in reversed(list(zip(filenames, filenames[1:]))):
+            if os.path.isfile(source):
+                os.replace(source, target)
+        if self.backup_count == 0:
+            os.remove(self.filename)
+        if self._indexes is not None:
+            self._indexes = [dict()] + self._indexes[: self.backup_count]
+        self._size = 0
+
+    def write(self, entries: List[dict]):
+        """Appends `entries` with one write and syncs them to disk."""
+        lines = [(entry, (json.dumps(entry) + "\n").encode()) for entry in entries]
+        with self._lock:
+            if self._size is None:
+                self._size = os.path.getsize(self.filename) if os.path.isfile(self.filename) else 0
+            size = sum(len(line) for _, line in lines)
+            if self._size and self._size + size > self.max_bytes:
+                self._rotate()
+            with open(self.filename, "ab") as file:
+                file.write(b"".join(line for _, line in lines))
+                file.flush()
+                os.fsync(file.fileno())
+            if self._indexes is not None:
+                offset = self._size
+                for entry, line in lines:
+                    self._add(self._indexes[0], entry, offset)
+                    offset += len(line)
+            self._size += size
+
+    def query(
+        self, kind: str, value: str, since: float = 0, limit: int = AUDIT_QUERY_LIMIT
+    ) -> List[dict]:
+        """Entries of a user id or server name (`kind` "user" or "server"), newest first."""
+        key = (kind, str(value).casefold())
+        entries = list()
+        with self._lock:
+            self._load()
+            for filename, index in zip(self._filenames(), self._indexes):
+                positions = index.get(key, [])
+                start = bisect_left(positions, (since,))
+                if start == len(positions):
+                    continue
+                with open(filename, "rb") as file:
+                    for _, offset in reversed(positions[start:]):
+                        file.seek(offset)
+                        entries.append(json.loads(file.readline()))
+                        if len(entries) >= limit:
+                            return entries
+        return entries
+
+
+class AuditWriter(threading.Thread):
+    """Appends entries to an audit log in batches, in its own thread.
+
+    The queue is unbounded, so `write` never blocks the event loop, and the writer
+    does not depend on the logging level or wait for any other output.
+    """
+
+    def __init__(self, audit_log: AuditLog):
+        super().__init__(name="audit-writer", daemon=True)
+        self.audit_log = audit_log
+        self.queue = queue.SimpleQueue()
+
+    def write(self, entry: dict):
+        self.queue.put(entry)
+
+    def run(self):
+        while True:
+            entries = [self.queue.get()]
+            while len(entries) < AUDIT_BATCH_SIZE:
+                try:
+                    entries.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = _STOP in entries
+            entries = [entry for entry in entries if entry is not _STOP]
+            if entries:
+                try:
+                    self.audit_log.write(entries)
+                except OSError as ex:
+                    print(f"AUDIT: writing the audit log failed with {ex!r}", file=sys.stderr)
+            if stop:
+                return
+
+    def stop(self):
+        """Writes what is still queued, e.g. on exit."""
+        if self.is_alive():
+            self.queue.put(_STOP)
+            self.join(AUDIT_STOP_TIMEOUT)
+
+
+def parse_since(since: str, now: float = None) -> float:
+    """`30m`, `12h`, `7d`, `2w` ago or a date like `2021-05-01`, as a timestamp."""
+    now = time.time() if now is None else now
+    match = SINCE_PATTERN.match(since.lower())
+    if match:
+        return now - int(match.group(1)) * SINCE_UNITS[match.group(2)]
+    try:
+        return datetime.fromisoformat(since).timestamp()
+    except ValueError:
+        raise ValueError(f"`{since}` is no duration like `12h`, `7d` or date like `2021-05-01`")
@@ -0,0 +1,177 @@
+import asyncio
+import logging
+from typing import Callable, List, Optional, Tuple
+
+from discord.ext.commands import ArgumentParsingError
+from discord.ext.commands.view import StringView, _quotes
+
+from bot.utils import user_action_log
+from bot.utils.outbox import BLANK, EMBED_FIELD_VALUE_LIMIT
+
+BATCH_BARRIER = "wait"  # waits for all previous commands before starting the next ones
+BATCH_STEP_TIMEOUT = 30  # seconds
+BATCH_NAME_LIMIT = 128  # characters of a command shown as embed field name
+# steps per embed, so that even the longest names and results stay below 6000 characters
+BATCH_STEPS_PER_EMBED = 5
+
+BATCH_NOT_FOUND = "execution failed - command not found"
+BATCH_FAILED = "execution failed"
+BATCH_TIMED_OUT = "execution timed out"
+BATCH_NO_PERMISSION = "Command failed due to lack of permissions."
+
+
+def accepts_groups(func):
+    """Marks a command that runs on server groups itself, so it is not run once per server."""
+    func.accepts_groups = True
+    return func
+
+
+def split_arguments(text: str) -> List[str]:
+    """Splits `text` into arguments like discord.py does, quoted arguments stay together.
+
+    Raises discord.py's ArgumentParsingError for unbalanced quotes.
+    """
+    view = StringView(text)
+    arguments = list()
+    while not view.eof:
+        view.skip_ws()
+        if not view.eof:
+            arguments.append(view.get_quoted_word())
+    return arguments
+
+
+def quote_argument(argument: str) -> str:
+    """Quotes an argument if needed, so that `split_arguments` gives it back unchanged."""
+    if argument and not any(char.isspace() or char in _quotes for char in argument):
+        return argument
+    return '"' + argument.replace('"', '\\"') + '"'
+
+
+class BatchStep:
+    def __init__(self, index: int, name: str, arguments: List[str], command):
+        self.index = index
+        self.name = name
+        self.arguments = arguments
+        self.command = command
+        self.result = None
+
+    @property
+    def args(self) -> str:
+        """The command as it would be typed."""
+        return " ".join([self.name] + [quote_argument(argument) for argument in self.arguments])
+
+    @property
+    def server_name(self) -> Optional[str]:
+        if self.command is None:
+            return None
+        params = list(self.command.clean_params)
+        if "server_name" not in params:
+            return None
+        position = params.index("server_name")
+        if position >= len(self.arguments):
+            return None
+        return self.arguments[position]
+
+    @property
+    def accepts_groups(self) -> bool:
+        return getattr(getattr(self.command, "callback", None), "accepts_groups", False)
+
+    def for_server(self, index: int, server_name: str) -> "BatchStep":
+        """This step with its server replaced, for running it on each server of a group."""
+        arguments = list(self.arguments)
+        arguments[list(self.command.clean_params).index("server_name")] = server_name
+        return BatchStep(index, self.name, arguments, self.command)
+
+    def field(self, value) -> Tuple[str, str]:
+        """Embed field name and value showing `value` for this step, within discord's limits."""
+        return _shorten(self.args, BATCH_NAME_LIMIT), _shorten(value, EMBED_FIELD_VALUE_LIMIT)
+
+    @property
+    def lane(self) -> Optional[str]:
+        """Steps in the same lane run in submitted order, lanes run concurrently."""
+        server_name = self.server_name
+        return server_name.lower() if server_name else None
+
+
+def _shorten(text, limit: int) -> str:
+    text = str(text) if text not in (None, "") else BLANK
+    return text if len(text) <= limit else text[: limit - 1] + "…"
+
+
+def plan_batch(
+    bot, batch_commands, get_group: Callable[[str], Optional[List[str]]] = None
+) -> List[List[BatchStep]]:
+    """Splits batch commands into stages separated by `BATCH_BARRIER`.
+
+    Commands are given as typed or as already split `BatchStep`s. A command for a
+    server group, as told by `get_group`, becomes one step per server.
+    """
+    stages = [[]]
+    index = 0
+    for args in batch_commands:
+        if isinstance(args, BatchStep):
+            step = args
+            step.index = index
+        elif args.strip().lower() == BATCH_BARRIER:
+            stages.append([])
+            continue
+        else:
+            try:
+                words = split_arguments(args) or [""]
+            except ArgumentParsingError:
+                words = args.split() or [""]
+            step = BatchStep(index, words[0], words[1:], bot.all_commands.get(words[0].lower()))
+        members = None
+        if get_group is not None and step.server_name and not step.accepts_groups:
+            members = get_group(step.server_name)
+        steps = [step] if members is None else [
+            step.for_server(index + offset, member) for offset, member in enumerate(members)
+        ]
+        stages[-1].extend(steps)
+        index += len(steps)
+    return [stage for stage in stages if stage]
+
+
+async def _run_step(ctx, step: BatchStep, timeout: float):
+    if step.command is None:
+        return BATCH_NOT_FOUND
+    # audited per step, so that the actions show up for the server they ran on
+    user_action_log(
+        ctx,
+        f"INVOKED {step.name.upper():<10} args: {step.arguments} (batch)",
+        server_name=step.server_name,
+    )
+    task = asyncio.ensure_future(step.command(ctx, *step.arguments))
+    done, _ = await asyncio.wait({task}, timeout=timeout)
+    if not done:
+        task.cancel()
+        logging.error(f"BATCH: {step.command} timed out after {timeout}s")
+        return BATCH_TIMED_OUT
+    try:
+        data = task.result()
+    except Exception as ex:
+        logging.exception(f"BATCH: {step.command} failed with {ex}")
+        return BATCH_FAILED
+    if data is None:
+        return BATCH_NO_PERMISSION
+    return data
+
+
+async def run_batch(
+    ctx,
+    stages: List[List[BatchStep]],
+    on_step_done: Callable[[BatchStep], None],
+    timeout: float = BATCH_STEP_TIMEOUT,
+):
+    """Runs all stages one after another, the lanes of a stage concurrently."""
+
+    async def run_lane(steps: List[BatchStep]):
+        for step in steps:
+            step.result = await _run_step(ctx, step, timeout)
+            on_step_done(step)
+
+    for stage in stages:
+        lanes = dict()
+        for step in stage:
+            lanes.setdefault(step.lane, []).append(step)
+        await asyncio.gather(*[run_lane(steps) for steps in lanes.values()])
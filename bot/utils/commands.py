@@ -1,7 +1,12 @@
 import asyncio
 import json
+import logging
 import os
+import signal
 
+import discord
+
+from bot.utils.live_embed import LiveEmbed
 from bot.utils.pavlov import (
     check_perm_admin,
     check_perm_captain,
@@ -19,6 +24,15 @@ PERMISSIONS = {
 
 DEFAULT_FORMAT = {}
 
+COMMAND_TIMEOUT = 10  # seconds
+COMMAND_MAX_INSTANCES = 1  # per command
+COMMAND_CONCURRENCY = 4  # all commands
+COMMAND_KILL_GRACE = 2  # seconds between SIGTERM and SIGKILL
+OUTPUT_MAX_SIZE = 900  # characters kept per stream, the tail is shown
+OUTPUT_READ_SIZE = 4096
+
+_global_limit = None
+
 
 class NotFoundError(Exception):
     def __init__(self, command_name: str):
@@ -30,6 +44,31 @@ class InvalidCommand(Exception):
         self.command_name = command_name
 
 
+class OutputBuffer:
+    """Keeps the last `max_size` characters written to it."""
+
+    def __init__(self, max_size: int = OUTPUT_MAX_SIZE):
+        self.max_size = max_size
+        self.truncated = False
+        self._data = bytearray()
+
+    def write(self, data: bytes):
+        self._data += data
+        # a character takes at most 4 bytes, the kept bytes hold at least max_size characters
+        if len(self._data) > 4 * self.max_size:
+            del self._data[: -4 * self.max_size]
+            self.truncated = True
+
+    def __bool__(self):
+        return len(self._data) > 0
+
+    def __str__(self):
+        text = self._data.decode(errors="replace")
+        if self.truncated or len(text) > self.max_size:
+            return "..." + text[-self.max_size :]
+        return text
+
+
 class Command:
     def __init__(self, name: str, data: dict):
         self.name = name
@@ -40,27 +79,98 @@ class Command:
         self._perm_check = check_perm_admin
         if self.permission.lower() in PERMISSIONS:
             self._perm_check = PERMISSIONS.get(self.permission.lower())
+        self.timeout = data.get("timeout", COMMAND_TIMEOUT)
+        self.max_instances = data.get("max_instances", COMMAND_MAX_INSTANCES)
+        self._limit = None
+
+    @property
+    def limit(self) -> asyncio.Semaphore:
+        if self._limit is None:
+            self._limit = asyncio.Semaphore(self.max_instances)
+        return self._limit
 
     async def __call__(self, ctx):
+        global _global_limit
         if self._perm_check:
             if not await self._perm_check(ctx, server_name=None, global_check=True):
                 return
+        if self.limit.locked():
+            await ctx.send(
+                embed=discord.Embed(description=f"Command `{self.name}` is already running.")
+            )
+            return
+        if _global_limit is None:
+            _global_limit = asyncio.Semaphore(COMMAND_CONCURRENCY)
+
+        async with self.limit:
+            embed = discord.Embed(title=f"`{self.name}` queued..")
+            live_embed = LiveEmbed(embed)
+            await live_embed.send(ctx)
+            try:
+                async with _global_limit:
+                    embed.title = f"`{self.name}` running.."
+                    live_embed.changed()
+                    embed.title = await self._run(embed, live_embed.changed)
+            finally:
+                await live_embed.close()
+
+    async def _run(self, embed: discord.Embed, on_output) -> str:
+        """Streams the output into `embed` and returns the final status."""
+        stdout, stderr = OutputBuffer(), OutputBuffer()
+
+        def show_output():
+            embed.description = ""
+            if stdout:
+                embed.description += f"**stdout**\n```{stdout}```"
+            if stderr:
+                embed.description += f"**stderr**\n```{stderr}```"
+            on_output()
+
+        async def read(stream: asyncio.StreamReader, buffer: OutputBuffer):
+            while True:
+                data = await stream.read(OUTPUT_READ_SIZE)
+                if not data:
+                    return
+                buffer.write(data)
+                show_output()
 
         proc = await self._get_process()
         try:
-            stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout=10)
-            if stdout:
-                await ctx.send(f"**stdout**\n```{stdout.decode()}```")
-            if stderr:
-                await ctx.send(f"**stderr**\n```{stderr.decode()}```")
+            await asyncio.wait_for(
+                asyncio.gather(read(proc.stdout, stdout), read(proc.stderr, stderr), proc.wait()),
+                timeout=self.timeout,
+            )
         except asyncio.TimeoutError:
-            pass
+            await self._kill(proc)
+            logging.warning(f"COMMAND: {self.name} timed out after {self.timeout}s")
+            return f"`{self.name}` timed out after {self.timeout}s and was killed"
+        finally:
+            if proc.returncode is None:
+                await self._kill(proc)
+        return f"`{self.name}` done (exit code {proc.returncode})"
 
     async def _get_process(self) -> asyncio.subprocess.Process:
+        # a session of its own, so the whole process group can be killed on timeout
         return await asyncio.create_subprocess_shell(
-            self.command, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+            self.command,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            start_new_session=True,
         )
 
+    @staticmethod
+    async def _kill(proc: asyncio.subprocess.Process):
+        for sig in [signal.SIGTERM, signal.SIGKILL]:
+            try:
+                os.killpg(proc.pid, sig)
+            except ProcessLookupError:
+                pass
+            try:
+                await asyncio.wait_for(asyncio.shield(proc.wait()), timeout=COMMAND_KILL_GRACE)
+                return
+            except asyncio.TimeoutError:
+                pass
+
 
 class Commands:
     NotFoundError = NotFoundError
@@ -68,21 +178,52 @@ class Commands:
     def __init__(self, filename="commands.json"):
         self._filename = filename
         self._commands = {}
+        self._index = {}
         if not os.path.isfile(filename):
             with open(filename, "w") as file:
                 json.dump(DEFAULT_FORMAT, file)
         with open(filename) as file:
-            data = json.load(file)
-            self._commands = data
-
-    def _find_command(self, command_name: str) -> dict:
-        if command_name not in self._commands:
-            for name in self._commands.keys():
-                if name.lower() == command_name.lower():
-                    command_name = name
-                    break
-        return self._commands.get(command_name)
-
-    def get(self, command_name: str):
-        command = self._find_command(command_name)
-        return Command(name=command_name, data=command)
+            self.apply(self.parse(json.load(file)))
+
+    @property
+    def filename(self):
+        return self._filename
+
+    @staticmethod
+    def parse(data):
+        """Validates commands.json data and builds its commands, raises ValueError if invalid."""
+        if not isinstance(data, dict):
+            raise ValueError("commands have to be an object of command name to command")
+        commands = {}
+        index = {}
+        for name, command in data.items():
+            if not isinstance(command, dict) or not isinstance(command.get("command"), str):
+                raise ValueError(f"command {name} needs a command string")
+            if not isinstance(command.get("permission", ""), str):
+                raise ValueError(f"permission of command {name} has to be a string")
+            timeout = command.get("timeout", COMMAND_TIMEOUT)
+            if not isinstance(timeout, (int, float)) or timeout <= 0:
+                raise ValueError(f"timeout of command {name} has to be a positive number")
+            max_instances = command.get("max_instances", COMMAND_MAX_INSTANCES)
+            if not isinstance(max_instances, int) or max_instances <= 0:
+                raise ValueError(f"max_instances of command {name} has to be a positive integer")
+            commands[name] = Command(name=name, data=command)
+            index.setdefault(name.casefold(), commands[name])
+        return commands, index
+
+    def apply(self, parsed):
+        """Swaps in parsed commands, unchanged limits keep counting running instances."""
+        previous = self._commands
+        self._commands, self._index = parsed
+        for name, command in self._commands.items():
+            old = previous.get(name)
+            if old is not None and old.max_instances == command.max_instances:
+                command._limit = old._limit
+
+    def get(self, command_name: str) -> Command:
+        command = self._commands.get(command_name)
+        if command is None:
+            command = self._index.get(command_name.casefold())
+            if command is None:
+                raise NotFoundError(command_name)
+        return command
@@ -1,7 +1,13 @@
 import json
 import os
 
-default_config = {"prefix": ";", "token": ""}
+default_config = {
+    "prefix": ";",
+    "token": "",
+    "status_poll_interval": 0,
+    "metrics_port": 0,
+    "typing_delay": 1,
+}
 
 
 class Config:
@@ -12,11 +18,31 @@ class Config:
             with open(filename, "w") as file:
                 json.dump(default_config, file)
         with open(filename) as file:
-            self.config = json.load(file)
+            self.apply(self.parse(json.load(file)))
+
+    @staticmethod
+    def parse(data):
+        if not isinstance(data, dict):
+            raise ValueError("config has to be an object")
+        prefix = data.get("prefix", default_config.get("prefix"))
+        if not isinstance(prefix, str) or not prefix:
+            raise ValueError("prefix has to be a non-empty string")
+        typing_delay = data.get("typing_delay", default_config.get("typing_delay"))
+        if not isinstance(typing_delay, (int, float)) or typing_delay < 0:
+            raise ValueError("typing_delay has to be a number of seconds")
+        return data
+
+    def apply(self, config):
+        self.config = config
         self.prefix = self.config.get("prefix", default_config.get("prefix"))
         self.token = self.config.get("token", default_config.get("token"))
+        self.status_poll_interval = self.config.get(
+            "status_poll_interval", default_config.get("status_poll_interval")
+        )
+        self.metrics_port = self.config.get("metrics_port", default_config.get("metrics_port"))
+        self.typing_delay = self.config.get("typing_delay", default_config.get("typing_delay"))
 
     def store(self):
-        c = {"prefix": self.prefix, "token": self.token}
+        c = {**self.config, "prefix": self.prefix, "token": self.token}
         with open(self.filename, "w") as file:
             json.dump(c, file)
@@ -0,0 +1,76 @@
+import asyncio
+import logging
+
+import discord
+from discord.ext import commands
+
+from bot.utils.outbox import outbox
+
+TYPING_REFRESH_INTERVAL = 8  # seconds, discord shows typing for 10 seconds
+
+
+class PavlovContext(commands.Context):
+    """Context that shows typing only for commands which take a while to answer.
+
+    Typing starts after a delay, is refreshed while the command runs and stops with
+    the first message sent or when the command is done. Messages go through the
+    channel's outbox.
+    """
+
+    batch_steps = None  # steps of a command for a server group, run by ;batch instead
+    _typing_task = None
+    _typing_done = False
+    _finished = False
+
+    def start_typing(self, delay: float):
+        if self._typing_task is None and not self._typing_done:
+            self._typing_task = asyncio.ensure_future(self._typing(delay))
+
+    def stop_typing(self):
+        self._typing_done = True
+        if self._typing_task is not None:
+            self._typing_task.cancel()
+            self._typing_task = None
+
+    async def _typing(self, delay: float):
+        await asyncio.sleep(delay)
+        while True:
+            try:
+                await self.trigger_typing()
+            except discord.HTTPException as ex:
+                logging.debug(f"Triggering typing failed with {ex}")
+            await asyncio.sleep(TYPING_REFRESH_INTERVAL)
+
+    def finish(self):
+        """Called when the command is done, held back messages are sent right away."""
+        self.stop_typing()
+        self._finished = True
+        outbox.flush(self)
+
+    async def send(self, content: str = None, *, coalesce: bool = True, **kwargs):
+        """Queues a message, consecutive messages of the command may be merged into one.
+
+        Only with `coalesce=False` the sent message is returned, e.g. to edit it later.
+        """
+        self.stop_typing()
+        kwargs = {key: value for key, value in kwargs.items() if value is not None}
+        future = outbox.send(
+            self.channel.id,
+            self._deliver,
+            self,
+            content,
+            coalesce=coalesce,
+            done=self._finished,
+            **kwargs,
+        )
+        if not coalesce:
+            return await future
+        future.add_done_callback(self._delivered)
+
+    async def _deliver(self, content: str = None, **kwargs):
+        return await super().send(content, **kwargs)
+
+    @staticmethod
+    def _delivered(future: asyncio.Future):
+        if future.exception() is not None:
+            logging.error(f"OUTBOX: sending a message failed with {future.exception()!r}")
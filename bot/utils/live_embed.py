@@ -0,0 +1,41 @@
+import asyncio
+
+import discord
+
+LIVE_EMBED_EDIT_INTERVAL = 1  # seconds
+
+
+class LiveEmbed:
+    """Embed message that follows changes to its embed, edited at most once per interval."""
+
+    def __init__(self, embed: discord.Embed, interval: float = LIVE_EMBED_EDIT_INTERVAL):
+        self.embed = embed
+        self.interval = interval
+        self.message = None
+        self._changed = None
+        self._task = None
+
+    async def send(self, ctx):
+        self.message = await ctx.send(embed=self.embed, coalesce=False)
+        self._changed = asyncio.Event()
+        self._task = asyncio.ensure_future(self._stream())
+        return self.message
+
+    def changed(self):
+        if self._changed is not None:
+            self._changed.set()
+
+    async def _stream(self):
+        while True:
+            await self._changed.wait()
+            self._changed.clear()
+            await self.message.edit(embed=self.embed)
+            await asyncio.sleep(self.interval)
+
+    async def close(self):
+        """Stops following changes and shows the final state of the embed."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self.message is not None:
+            await self.message.edit(embed=self.embed)
@@ -0,0 +1,73 @@
+import logging
+import queue
+import sys
+import threading
+from logging.handlers import QueueHandler
+from typing import List, TextIO
+
+LOG_QUEUE_SIZE = 10000  # records waiting for the writer, further ones are dropped
+LOG_BATCH_SIZE = 200  # records written to the stream at once
+LOG_STOP_TIMEOUT = 5  # seconds to wait for the writer to catch up on exit
+
+_STOP = object()
+
+
+class DroppingQueueHandler(QueueHandler):
+    """Hands records to the writer thread without ever blocking the event loop.
+
+    When the writer falls behind and the queue is full, log records are dropped and
+    counted.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class LogWriter(threading.Thread):
+    """Writes queued log records in batches, one write and flush per batch."""
+
+    def __init__(self, stream: TextIO, formatter: logging.Formatter):
+        super().__init__(name="log-writer", daemon=True)
+        self.queue = queue.Queue(LOG_QUEUE_SIZE)
+        self.handler = DroppingQueueHandler(self.queue)
+        self.stream = stream
+        self.formatter = formatter
+        self._reported_dropped = 0
+
+    def run(self):
+        while True:
+            records = [self.queue.get()]
+            while len(records) < LOG_BATCH_SIZE:
+                try:
+                    records.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = _STOP in records
+            self._write([record for record in records if record is not _STOP])
+            if stop:
+                return
+
+    def _write(self, records: List[logging.LogRecord]):
+        lines = [self.formatter.format(record) + "\n" for record in records]
+        dropped = self.handler.dropped - self._reported_dropped
+        if dropped:
+            self._reported_dropped += dropped
+            lines.append(f"LOGS: dropped {dropped} log records, the writer fell behind\n")
+        try:
+            self.stream.write("".join(lines))
+            self.stream.flush()
+        except Exception as ex:
+            print(f"LOGS: writing log records failed with {ex!r}", file=sys.stderr)
+
+    def stop(self):
+        """Writes what is still queued, e.g. on exit."""
+        if self.is_alive():
+            self.queue.put(_STOP)
+            self.join(LOG_STOP_TIMEOUT)
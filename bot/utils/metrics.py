@@ -0,0 +1,175 @@
+import logging
+from bisect import bisect_left
+from typing import Dict, List, Sequence, Tuple
+
+from aiohttp import web
+
+METRICS_HOST = "127.0.0.1"
+LATENCY_BUCKETS = [0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30]  # seconds
+
+
+def _escape_label(value) -> str:
+    """as the Prometheus text format requires for label values"""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape_label(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values = dict()
+
+    def inc(self, *labels, amount: float = 1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def total(self) -> float:
+        return sum(self.values.values())
+
+    def render(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {value}"
+            for labels, value in sorted(self.values.items())
+        ]
+
+
+class HistogramValue:
+    def __init__(self, bucket_count: int):
+        self.counts = [0] * (bucket_count + 1)  # the last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = list(buckets)
+        self.values: Dict[Tuple, HistogramValue] = dict()
+
+    def observe(self, value: float, *labels):
+        histogram = self.values.get(labels)
+        if histogram is None:
+            histogram = self.values[labels] = HistogramValue(len(self.buckets))
+        histogram.counts[bisect_left(self.buckets, value)] += 1
+        histogram.sum += value
+        histogram.count += 1
+
+    def quantile(self, q: float, *labels) -> float:
+        """Upper bound of the bucket holding the `q` quantile, inf if above all buckets."""
+        histogram = self.values.get(labels)
+        if histogram is None or histogram.count == 0:
+            return 0.0
+        rank = q * histogram.count
+        cumulative = 0
+        for bound, count in zip(self.buckets, histogram.counts):
+            cumulative += count
+            if cumulative >= rank:
+                return bound
+        return float("inf")
+
+    def render(self) -> List[str]:
+        lines = list()
+        for labels, histogram in sorted(self.values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ["+Inf"], histogram.counts):
+                cumulative += count
+                bucket_labels = _format_labels(self.labelnames, labels, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            labels = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{labels} {histogram.sum}")
+            lines.append(f"{self.name}_count{labels} {histogram.count}")
+        return lines
+
+
+class Metrics:
+    """In-process counters and histograms, rendered in the Prometheus text format.
+
+    Recording a value is a dict lookup and an addition, so it can be done on every
+    command and RCON request.
+    """
+
+    def __init__(self):
+        self._metrics = list()
+        self._runner = None
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        counter = Counter(name, documentation, labelnames)
+        self._metrics.append(counter)
+        return counter
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        histogram = Histogram(name, documentation, labelnames, buckets)
+        self._metrics.append(histogram)
+        return histogram
+
+    def render(self) -> str:
+        lines = list()
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    async def _handle(self, request):
+        return web.Response(text=self.render(), content_type="text/plain")
+
+    async def start(self, port: int, host: str = METRICS_HOST):
+        """Serves `/metrics` on `host:port`, a falsy port disables the endpoint."""
+        if not port or self._runner is not None:
+            return
+        app = web.Application()
+        app.router.add_get("/metrics", self._handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        try:
+            await web.TCPSite(self._runner, host, port).start()
+        except OSError as ex:
+            logging.error(f"METRICS: serving on {host}:{port} failed with {ex}")
+            await self._runner.cleanup()
+            self._runner = None
+            return
+        logging.info(f"METRICS: serving on http://{host}:{port}/metrics")
+
+
+metrics = Metrics()
+
+command_duration = metrics.histogram(
+    "pavlovbot_command_duration_seconds", "Duration of bot commands", ["command"]
+)
+command_errors = metrics.counter(
+    "pavlovbot_command_errors_total", "Failed bot commands by error", ["error"]
+)
+rcon_rtt = metrics.histogram(
+    "pavlovbot_rcon_rtt_seconds", "Round-trip time of RCON commands", ["server"]
+)
+rcon_errors = metrics.counter(
+    "pavlovbot_rcon_errors_total", "Failed RCON commands by error", ["server", "error"]
+)
+workshop_cache = metrics.counter(
+    "pavlovbot_workshop_cache_total", "Workshop map lookups by cache result", ["result"]
+)
@@ -0,0 +1,220 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, Optional
+
+import discord
+
+OUTBOX_WINDOW = 0.5  # seconds messages of a running command are held back to be merged
+OUTBOX_RETRIES = 3  # after discord.py's own retries ran out on a rate limit
+OUTBOX_DEFAULT_RETRY_AFTER = 1  # seconds, if a rate limit response has no usable header
+
+CONTENT_LIMIT = 2000
+EMBED_DESCRIPTION_LIMIT = 2048
+EMBED_FIELDS_LIMIT = 25
+EMBED_FIELD_NAME_LIMIT = 256
+EMBED_FIELD_VALUE_LIMIT = 1024
+BLANK = "\u200b"  # for embed field names and values which must not be empty
+EMBED_TOTAL_LIMIT = 6000
+
+
+def retry_after(ex: discord.HTTPException) -> float:
+    headers = getattr(ex.response, "headers", None) or {}
+    for header in ["Retry-After", "X-RateLimit-Reset-After"]:
+        try:
+            return float(headers[header])
+        except (KeyError, TypeError, ValueError):
+            pass
+    return OUTBOX_DEFAULT_RETRY_AFTER
+
+
+class OutgoingMessage:
+    def __init__(
+        self,
+        deliver: Callable[..., Awaitable],
+        origin,
+        content: Optional[str],
+        embed: Optional[discord.Embed],
+        kwargs: dict,
+        coalesce: bool,
+        window: float,
+    ):
+        self.deliver = deliver
+        self.origin = origin
+        self.content = content
+        self.embed = embed
+        self.kwargs = kwargs
+        self.coalesce = coalesce
+        self.due = time.monotonic() + window
+        self.future = asyncio.get_event_loop().create_future()
+        self._copied = False
+
+    @property
+    def mergeable(self) -> bool:
+        if not self.coalesce or self.kwargs:
+            return False
+        return (self.content is None) != (self.embed is None)
+
+    def merge(self, other: "OutgoingMessage") -> bool:
+        """Appends `other` to this message if both come from one command and fit into one."""
+        if other.origin is not self.origin or not (self.mergeable and other.mergeable):
+            return False
+        if self.content is not None and other.content is not None:
+            content = f"{self.content}\n{other.content}"
+            if len(content) > CONTENT_LIMIT:
+                return False
+            self.content = content
+            return True
+        if self.embed is None or other.embed is None:
+            return False
+        return self._merge_embed(other.embed)
+
+    def _merge_embed(self, other: discord.Embed) -> bool:
+        if other.image or other.thumbnail or other.author or other.url:
+            return False
+        if other.footer and self.embed.footer:
+            return False
+        fields = [(field.name, field.value, field.inline) for field in other.fields]
+        description = self.embed.description
+        if self.embed.fields and (other.title or other.description):
+            # discord shows the description above the fields, later text goes after them
+            name, value = other.title or BLANK, other.description or BLANK
+            if len(name) > EMBED_FIELD_NAME_LIMIT or len(value) > EMBED_FIELD_VALUE_LIMIT:
+                return False
+            fields.insert(0, (name, value, False))
+        else:
+            parts = [part for part in [self.embed.description or None] if part]
+            if other.title:
+                parts.append(f"**{other.title}**")
+            if other.description:
+                parts.append(other.description)
+            description = "\n".join(parts)
+        if (
+            len(description or "") > EMBED_DESCRIPTION_LIMIT
+            or len(self.embed.fields) + len(fields) > EMBED_FIELDS_LIMIT
+            or len(self.embed) + len(other) > EMBED_TOTAL_LIMIT
+        ):
+            return False
+        if not self._copied:
+            # the sender may still change its embed, e.g. to edit the message later
+            self.embed = self.embed.copy()
+            self._copied = True
+        self.embed.description = description
+        for name, value, inline in fields:
+            self.embed.add_field(name=name, value=value, inline=inline)
+        if other.footer:
+            self.embed.set_footer(text=other.footer.text, icon_url=other.footer.icon_url)
+        return True
+
+
+class Outbox:
+    """Per channel queue of outgoing messages.
+
+    Consecutive messages of one command are merged into one message, up to discord's
+    limits, and held back for at most `window` seconds or until the command is done.
+    Channels are sent to independently, a rate limited channel backs off on its own.
+    """
+
+    def __init__(self, window: float = OUTBOX_WINDOW):
+        self.window = window
+        self._queues: Dict[int, deque] = dict()
+        self._wakeups: Dict[int, asyncio.Event] = dict()
+        self._tasks: Dict[int, asyncio.Task] = dict()
+
+    def send(
+        self,
+        channel_id: int,
+        deliver: Callable[..., Awaitable],
+        origin,
+        content: str = None,
+        embed: discord.Embed = None,
+        coalesce: bool = True,
+        done: bool = False,
+        **kwargs,
+    ) -> asyncio.Future:
+        """Queues a message, the future resolves to the sent message.
+
+        `deliver(content, embed=..., **kwargs)` sends it, `done` tells the command of
+        `origin` has finished and will not send more.
+        """
+        window = self.window if coalesce and not done else 0
+        message = OutgoingMessage(deliver, origin, content, embed, kwargs, coalesce, window)
+        queue = self._queues.setdefault(channel_id, deque())
+        if not coalesce:
+            # whoever waits for this message must not wait for the ones held back before it
+            self._release(queue)
+        elif queue and queue[-1].merge(message):
+            return queue[-1].future
+        queue.append(message)
+        self._wake(channel_id)
+        return message.future
+
+    def flush(self, origin):
+        """Sends the held back messages of `origin` now."""
+        for channel_id, queue in self._queues.items():
+            if any(message.origin is origin for message in queue):
+                self._release(queue, origin)
+                self._wake(channel_id)
+
+    @staticmethod
+    def _release(queue: deque, origin=None):
+        for message in queue:
+            if origin is None or message.origin is origin:
+                message.due = 0
+
+    def _wake(self, channel_id: int):
+        wakeup = self._wakeups.setdefault(channel_id, asyncio.Event())
+        wakeup.set()
+        task = self._tasks.get(channel_id)
+        if task is None or task.done():
+            self._tasks[channel_id] = asyncio.ensure_future(self._worker(channel_id))
+
+    async def join(self, channel_id: int):
+        """Waits until everything queued for the channel has been sent."""
+        task = self._tasks.get(channel_id)
+        if task is not None:
+            await asyncio.shield(task)
+
+    async def _worker(self, channel_id: int):
+        queue = self._queues[channel_id]
+        wakeup = self._wakeups[channel_id]
+        while queue:
+            message = queue[0]
+            delay = message.due - time.monotonic()
+            if delay > 0:
+                wakeup.clear()
+                try:
+                    await asyncio.wait_for(wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            queue.popleft()
+            await self._deliver(message)
+        del self._queues[channel_id]
+        del self._wakeups[channel_id]
+        del self._tasks[channel_id]
+
+    @staticmethod
+    async def _deliver(message: OutgoingMessage):
+        for attempt in range(OUTBOX_RETRIES + 1):
+            try:
+                result = await message.deliver(
+                    message.content, embed=message.embed, **message.kwargs
+                )
+            except discord.HTTPException as ex:
+                if ex.status != 429 or attempt == OUTBOX_RETRIES:
+                    message.future.set_exception(ex)
+                    return
+                delay = retry_after(ex)
+                logging.warning(f"OUTBOX: rate limited, retrying in {delay}s")
+                await asyncio.sleep(delay)
+            except Exception as ex:
+                message.future.set_exception(ex)
+                return
+            else:
+                message.future.set_result(result)
+                return
+
+
+outbox = Outbox()
@@ -1,5 +1,9 @@
 import asyncio
-from typing import Iterable
+import logging
+from collections import OrderedDict
+from collections.abc import Sequence
+from itertools import islice
+from typing import Any, Callable, Iterable
 
 import discord
 
@@ -11,6 +15,8 @@ DELETE_EMOJI = "\u274c"
 
 PAGINATION_EMOJI = [FIRST_EMOJI, LEFT_EMOJI, RIGHT_EMOJI, LAST_EMOJI, DELETE_EMOJI]
 
+PAGINATOR_MAX_ACTIVE = 100
+
 
 class PageFull(Exception):
     pass
@@ -45,13 +51,55 @@ class Paginator:
         self.max_lines = max_lines
         self.index = 0
         self.pages = list()
+        self._source = None
+        self._iterator = None
+        self._formatter = str
+        self._page_count_hint = None
 
     def _new_page(self, line: str):
         page = Page(self.prefix, self.suffix, self.max_lines)
         page.add_line(line)
         self.pages.append(page)
 
+    def _load_until(self, count: int = None):
+        """Pulls items of an iterable source until it holds `count` items or is exhausted."""
+        if self._iterator is None:
+            return
+        if count is None:
+            self._source.extend(self._iterator)
+        else:
+            self._source.extend(islice(self._iterator, max(0, count - len(self._source))))
+        if count is None or len(self._source) < count:
+            self._iterator = None
+
+    def _page_count(self):
+        """Number of pages, the page count hint or None while an iterable source is unknown."""
+        if self._source is None:
+            return len(self.pages)
+        if self._iterator is None:
+            return max(1, -(-len(self._source) // self.max_lines))
+        return self._page_count_hint
+
+    def _source_page(self, index: int):
+        start = index * self.max_lines
+        self._load_until(start + self.max_lines)
+        items = self._source[start : start + self.max_lines]
+        if not items:
+            return None
+        page = Page(self.prefix, self.suffix, self.max_lines)
+        for item in items:
+            page.add_line(self._formatter(item))
+        return page
+
     def _get_current_page(self):
+        if self._source is not None:
+            page = self._source_page(self.index)
+            if page is None:
+                self._last_page()
+                page = self._source_page(self.index) or Page(
+                    self.prefix, self.suffix, self.max_lines
+                )
+            return page
         try:
             return self.pages[self.index]
         except IndexError:
@@ -60,7 +108,11 @@ class Paginator:
 
     def _next_page(self):
         self.index += 1
-        if self.index >= len(self.pages):
+        page_count = self._page_count()
+        if self._iterator is not None:
+            self._load_until((self.index + 1) * self.max_lines)
+            page_count = self._page_count() if self._iterator is None else None
+        if page_count is not None and self.index >= page_count:
             self._last_page()
 
     def _previous_page(self):
@@ -72,11 +124,15 @@ class Paginator:
         self.index = 0
 
     def _last_page(self):
-        self.index = len(self.pages) - 1
+        self._load_until()
+        self.index = self._page_count() - 1
 
     def _get_page_index(self) -> str:
-        if len(self.pages) > 1:
-            return f" (Page {self.index+1}/{len(self.pages)})"
+        page_count = self._page_count()
+        if page_count is None:
+            return f" (Page {self.index+1}/?)"
+        if page_count > 1:
+            return f" (Page {self.index+1}/{page_count})"
         return ""
 
     def _edit_embed(self, embed: discord.Embed, footer_text: str):
@@ -85,6 +141,23 @@ class Paginator:
         embed.set_footer(text=f"{footer_text}{self._get_page_index()}")
         return embed
 
+    def add_source(
+        self, source: Iterable, formatter: Callable[[Any], str] = str, page_count: int = None
+    ):
+        """Renders pages from `source` only when they are viewed.
+
+        A sequence is sliced per page, any other iterable is consumed as far as it has
+        been paged through. `page_count` is shown until an iterable is exhausted.
+        """
+        self._formatter = formatter
+        self._page_count_hint = page_count
+        if isinstance(source, Sequence):
+            self._source = source
+            self._iterator = None
+        else:
+            self._source = list()
+            self._iterator = iter(source)
+
     def add_line(self, line: str):
         if len(self.pages) == 0:
             self._new_page(line)
@@ -114,41 +187,100 @@ class Paginator:
         if embed is None:
             embed = discord.Embed()
 
-        def check(reaction_, user_):
-            return (
-                not user_.bot
-                and reaction_.emoji in PAGINATION_EMOJI
-                and reaction_.message.id == message.id
-            )
-
         embed = self._edit_embed(embed, footer_text)
-        message = await ctx.send(embed=embed)
-        if len(self.pages) == 1:
+        message = await ctx.send(embed=embed, coalesce=False)
+        if self._page_count() == 1:
             return  # no need for pagination if we only have one page
-        for emoji in PAGINATION_EMOJI:
-            await message.add_reaction(emoji)
+        await asyncio.gather(*[message.add_reaction(emoji) for emoji in PAGINATION_EMOJI])
+        paginators.register(ctx.bot, PaginatorSession(self, message, embed, timeout, footer_text))
 
-        while True:
-            try:
-                reaction, user = await ctx.bot.wait_for(
-                    "reaction_add", timeout=timeout, check=check
-                )
-            except asyncio.TimeoutError:
-                break
+    def navigate(self, emoji: str):
+        if emoji == FIRST_EMOJI:
+            self._first_page()
+        elif emoji == LAST_EMOJI:
+            self._last_page()
+        elif emoji == LEFT_EMOJI:
+            self._previous_page()
+        elif emoji == RIGHT_EMOJI:
+            self._next_page()
 
-            if reaction.emoji == DELETE_EMOJI:
-                break
 
-            if reaction.emoji == FIRST_EMOJI:
-                self._first_page()
-            elif reaction.emoji == LAST_EMOJI:
-                self._last_page()
-            elif reaction.emoji == LEFT_EMOJI:
-                self._previous_page()
-            elif reaction.emoji == RIGHT_EMOJI:
-                self._next_page()
-
-            await message.remove_reaction(reaction.emoji, user)
-            embed = self._edit_embed(embed, footer_text)
-            await message.edit(embed=embed)
-        await message.clear_reactions()
+class PaginatorSession:
+    def __init__(
+        self, paginator: Paginator, message, embed: discord.Embed, timeout: int, footer_text: str
+    ):
+        self.paginator = paginator
+        self.message = message
+        self.embed = embed
+        self.timeout = timeout
+        self.footer_text = footer_text
+        self.timer = None
+        self.lock = asyncio.Lock()
+
+    async def on_reaction(self, reaction, user):
+        async with self.lock:
+            self.paginator.navigate(reaction.emoji)
+            await self.message.remove_reaction(reaction.emoji, user)
+            self.embed = self.paginator._edit_embed(self.embed, self.footer_text)
+            await self.message.edit(embed=self.embed)
+
+
+class PaginatorRegistry:
+    """Routes reactions to open paginators by message id with one bot-wide listener.
+
+    At most `max_active` paginators are kept open, the least recently used one is
+    closed first.
+    """
+
+    def __init__(self, max_active: int = PAGINATOR_MAX_ACTIVE):
+        self.max_active = max_active
+        self._sessions = OrderedDict()
+        self._bot = None
+
+    def register(self, bot, session: PaginatorSession):
+        if self._bot is None:
+            bot.add_listener(self.on_reaction_add, "on_reaction_add")
+            self._bot = bot
+        self._sessions[session.message.id] = session
+        self._restart_timer(session)
+        while len(self._sessions) > self.max_active:
+            message_id = next(iter(self._sessions))
+            self.close(message_id)
+
+    def _restart_timer(self, session: PaginatorSession):
+        if session.timer is not None:
+            session.timer.cancel()
+        session.timer = asyncio.get_event_loop().call_later(
+            session.timeout, self.close, session.message.id
+        )
+
+    def close(self, message_id: int):
+        session = self._sessions.pop(message_id, None)
+        if session is None:
+            return
+        if session.timer is not None:
+            session.timer.cancel()
+        asyncio.ensure_future(self._clear_reactions(session))
+
+    @staticmethod
+    async def _clear_reactions(session: PaginatorSession):
+        try:
+            await session.message.clear_reactions()
+        except discord.HTTPException as ex:
+            logging.debug(f"Clearing paginator reactions failed with {ex}")
+
+    async def on_reaction_add(self, reaction, user):
+        if user.bot or reaction.emoji not in PAGINATION_EMOJI:
+            return
+        session = self._sessions.get(reaction.message.id)
+        if session is None:
+            return
+        if reaction.emoji == DELETE_EMOJI:
+            self.close(reaction.message.id)
+            return
+        self._sessions.move_to_end(reaction.message.id)
+        self._restart_timer(session)
+        await session.on_reaction(reaction, user)
+
+
+paginators = PaginatorRegistry()
@@ -1,18 +1,31 @@
+import asyncio
 import logging
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Tuple
 
 import discord
 
-from bot.utils import servers, user_action_log
-from pavlov import PavlovRCON
+from bot.utils import config, permissions, rcon_pool, servers, user_action_log
+from bot.utils.permissions import ADMIN, CAPTAIN, MODERATOR
+from bot.utils.player_index import PlayerIndex
+from bot.utils.rcon import is_read_only
+from bot.utils.sessions import SESSIONS_STALE_AFTER, SessionStore
+from bot.utils.status import SNAPSHOT_COMMANDS, ServerStatus, command_name
 
-RCON_TIMEOUT = 5
+FAN_OUT_CONCURRENCY = 10
+FAN_OUT_TIMEOUT = 10  # seconds
 
 
-MODERATOR_ROLE = "Mod-{}"
-CAPTAIN_ROLE = "Captain-{}"
+def _as_configured(listener):
+    """Passes server names to `listener` as spelled in servers.json, not as typed."""
+    return lambda server_name, data: listener(servers.get_name(server_name), data)
 
-SUPER_MODERATOR = "Mod-bot"
-SUPER_CAPTAIN = "Captain-bot"
+
+server_status = ServerStatus(servers, rcon_pool.send)
+# polled player lists may be further apart than the default
+sessions = SessionStore(stale_after=max(SESSIONS_STALE_AFTER, 3 * config.status_poll_interval))
+server_status.add_listener("RefreshList", _as_configured(sessions.observe))
+player_index = PlayerIndex()
+server_status.add_listener("RefreshList", _as_configured(player_index.observe))
 
 
 async def check_banned(ctx):
@@ -25,57 +38,34 @@ async def check_perm_admin(
     """ Admin permissions are stored per server in the servers.json """
     if not server_name and not global_check:
         return False
-    _servers = list()
     if server_name:
-        _servers.append(servers.get(server_name))
-    elif global_check:
-        _servers = servers.get_servers().values()
-    for server in _servers:
-        if ctx.author.id in server.get("admins", []):
-            return True
+        servers.get(server_name)  # raises ServerNotFoundError for unknown servers
+    if permissions.has(ctx.author, ADMIN, server_name, global_check):
+        return True
     if not sub_check:
         user_action_log(
             ctx,
             f"ADMIN CHECK FAILED server={server_name}, global_check={global_check}",
             log_level=logging.WARNING,
+            server_name=server_name,
         )
         if not ctx.batch_exec:
             await ctx.send(embed=discord.Embed(description=f"This command is only for Admins."))
     return False
 
 
-def check_has_any_role(
-    ctx, super_role: str, role_format: str, server_name: str = None, global_check: bool = True,
-):
-    super_role = discord.utils.get(ctx.author.roles, name=super_role)
-    if super_role is not None:
-        return True
-
-    role_names = list()
-    if global_check:
-        for server_name in servers.get_names():
-            role_names.append(role_format.format(server_name))
-    elif server_name:
-        role_names.append(role_format.format(server_name))
-
-    for role_name in role_names:
-        r = discord.utils.get(ctx.author.roles, name=role_name)
-        if r is not None:
-            return True
-    return False
-
-
 async def check_perm_moderator(
     ctx, server_name: str = None, sub_check: bool = False, global_check: bool = False
 ):
-    if await check_perm_admin(ctx, server_name, sub_check=True, global_check=global_check):
-        return True
-    if not check_has_any_role(ctx, SUPER_MODERATOR, MODERATOR_ROLE, server_name, global_check):
+    if server_name:
+        servers.get(server_name)
+    if not permissions.has(ctx.author, MODERATOR, server_name, global_check):
         if not sub_check:
             user_action_log(
                 ctx,
                 f"MOD CHECK FAILED server={server_name}, global_check={global_check}",
                 log_level=logging.WARNING,
+                server_name=server_name,
             )
             if not ctx.batch_exec:
                 await ctx.send(
@@ -88,13 +78,14 @@ async def check_perm_moderator(
 
 
 async def check_perm_captain(ctx, server_name: str = None, global_check: bool = False):
-    if await check_perm_moderator(ctx, server_name, sub_check=True, global_check=global_check):
-        return True
-    if not check_has_any_role(ctx, SUPER_CAPTAIN, CAPTAIN_ROLE, server_name, global_check):
+    if server_name:
+        servers.get(server_name)
+    if not permissions.has(ctx.author, CAPTAIN, server_name, global_check):
         user_action_log(
             ctx,
             f"CAPTAIN CHECK FAILED server={server_name} global_check={global_check}",
             log_level=logging.WARNING,
+            server_name=server_name,
         )
         if not ctx.batch_exec:
             await ctx.send(
@@ -104,18 +95,89 @@ async def check_perm_captain(ctx, server_name: str = None, global_check: bool =
     return True
 
 
-async def exec_server_command(ctx, server_name: str, command: str):
-    pavlov = None
-    if hasattr(ctx, "pavlov"):
-        pavlov = ctx.pavlov.get(server_name)
-    if not hasattr(ctx, "pavlov") or pavlov is None:
-        server = servers.get(server_name)
-        pavlov = PavlovRCON(
-            server.get("ip"), server.get("port"), server.get("password"), timeout=RCON_TIMEOUT,
-        )
-        if not hasattr(ctx, "pavlov"):
-            ctx.pavlov = {server_name: pavlov}
-        else:
-            ctx.pavlov[server_name] = pavlov
-    data = await pavlov.send(command)
+async def exec_server_command(ctx, server_name: str, command: str, max_age: float = None):
+    """`max_age` allows read commands to be answered from a status snapshot of that age"""
+    if max_age is not None:
+        data = server_status.get(server_name, command, max_age)
+        if data is not None:
+            return data
+    data = await rcon_pool.send(server_name, command)
+    if command_name(command) in SNAPSHOT_COMMANDS:
+        server_status.update(server_name, command, data)
+    elif not is_read_only(command):
+        server_status.invalidate(server_name)
     return data
+
+
+async def fan_out(
+    server_names: Iterable[str],
+    func: Callable[[str], Awaitable[Any]],
+    concurrency: int = FAN_OUT_CONCURRENCY,
+    timeout: float = FAN_OUT_TIMEOUT,
+) -> Dict[str, Any]:
+    """Runs `func(server_name)` for every server concurrently under one overall deadline.
+
+    Returns the results in the order of `server_names`. Failed servers map to the raised
+    exception, servers that missed the deadline to an `asyncio.TimeoutError`.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(server_name: str):
+        async with semaphore:
+            return await func(server_name)
+
+    tasks = {name: asyncio.ensure_future(run(name)) for name in server_names}
+    pending = set(tasks.values())
+    try:
+        if tasks:
+            _, pending = await asyncio.wait(tasks.values(), timeout=timeout)
+    finally:
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+    results = dict()
+    for name, task in tasks.items():
+        if task in pending:
+            results[name] = asyncio.TimeoutError()
+        elif task.exception() is not None:
+            results[name] = task.exception()
+        else:
+            results[name] = task.result()
+    return results
+
+
+async def first_result(
+    server_names: Iterable[str],
+    func: Callable[[str], Awaitable[Any]],
+    concurrency: int = FAN_OUT_CONCURRENCY,
+    timeout: float = FAN_OUT_TIMEOUT,
+) -> Optional[Tuple[str, Any]]:
+    """Runs `func(server_name)` for every server concurrently until one returns a result.
+
+    Returns the server and its result, or None if every server failed or returned None
+    before the deadline. The remaining calls are cancelled.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(server_name: str):
+        async with semaphore:
+            return server_name, await func(server_name)
+
+    pending = {asyncio.ensure_future(run(name)) for name in server_names}
+    deadline = asyncio.get_event_loop().time() + timeout
+    try:
+        while pending:
+            remaining = deadline - asyncio.get_event_loop().time()
+            if remaining <= 0:
+                return None
+            done, pending = await asyncio.wait(
+                pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                if task.exception() is None and task.result()[1] is not None:
+                    return task.result()
+        return None
+    finally:
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
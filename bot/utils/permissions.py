@@ -0,0 +1,127 @@
+from collections import OrderedDict
+
+MODERATOR_ROLE = "Mod-{}"
+CAPTAIN_ROLE = "Captain-{}"
+
+SUPER_MODERATOR = "Mod-bot"
+SUPER_CAPTAIN = "Captain-bot"
+
+CAPTAIN = 1
+MODERATOR = 2
+ADMIN = 3
+
+PERMISSION_CACHE_SIZE = 1000
+
+
+class Grants:
+    """Permission levels of one member, per server key and for all servers."""
+
+    def __init__(self):
+        self.servers = dict()
+        self.global_level = 0
+        self.max_level = 0
+
+    def grant(self, level: int, server_key: str = None):
+        if server_key is None:
+            self.global_level = max(self.global_level, level)
+        else:
+            self.servers[server_key] = max(self.servers.get(server_key, 0), level)
+        self.max_level = max(self.max_level, level)
+
+    def has(self, level: int, server_key: str = None, global_check: bool = False):
+        if self.global_level >= level:
+            return True
+        if server_key is not None:
+            return self.servers.get(server_key, 0) >= level
+        if global_check:
+            return self.max_level >= level
+        return False
+
+
+class Permissions:
+    """Resolves admin ids and Mod-/Captain- roles against servers.json.
+
+    Admin ids and role names are indexed once per servers.json version, the grants
+    of a member are resolved from its roles once and cached until its roles, the
+    guild roles or the servers change.
+    """
+
+    def __init__(self, servers, cache_size: int = PERMISSION_CACHE_SIZE):
+        self.servers = servers
+        self.cache_size = cache_size
+        self._admins = dict()
+        self._roles = dict()
+        self._cache = OrderedDict()
+        self.rebuild()
+
+    def rebuild(self):
+        admins = dict()
+        roles = {
+            SUPER_MODERATOR.casefold(): (MODERATOR, None),
+            SUPER_CAPTAIN.casefold(): (CAPTAIN, None),
+        }
+        for name, server in self.servers.get_servers().items():
+            key = name.casefold()
+            for admin_id in server.get("admins", []):
+                admins.setdefault(admin_id, set()).add(key)
+            roles.setdefault(MODERATOR_ROLE.format(name).casefold(), (MODERATOR, key))
+            roles.setdefault(CAPTAIN_ROLE.format(name).casefold(), (CAPTAIN, key))
+        self._admins, self._roles = admins, roles
+        self._cache.clear()
+
+    def _resolve(self, member):
+        grants = Grants()
+        for server_key in self._admins.get(member.id, ()):
+            grants.grant(ADMIN, server_key)
+        for role in getattr(member, "roles", []):
+            entry = self._roles.get(role.name.casefold())
+            if entry is not None:
+                grants.grant(*entry)
+        return grants
+
+    def get(self, member) -> Grants:
+        guild = getattr(member, "guild", None)
+        key = (guild.id if guild is not None else None, member.id)
+        grants = self._cache.get(key)
+        if grants is None:
+            grants = self._resolve(member)
+            self._cache[key] = grants
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        else:
+            self._cache.move_to_end(key)
+        return grants
+
+    def has(self, member, level: int, server_name: str = None, global_check: bool = False):
+        server_key = server_name.casefold() if server_name else None
+        return self.get(member).has(level, server_key, global_check)
+
+    def invalidate(self, guild_id: int = None, member_id: int = None):
+        if member_id is not None:
+            self._cache.pop((guild_id, member_id), None)
+            return
+        for key in [key for key in self._cache if key[0] == guild_id]:
+            del self._cache[key]
+
+    async def on_member_update(self, before, after):
+        if before.roles != after.roles:
+            self.invalidate(after.guild.id, after.id)
+
+    async def on_member_remove(self, member):
+        self.invalidate(member.guild.id, member.id)
+
+    async def on_guild_role_update(self, before, after):
+        if before.name != after.name:
+            self.invalidate(after.guild.id)
+
+    async def on_guild_role_delete(self, role):
+        self.invalidate(role.guild.id)
+
+    def listen(self, bot):
+        for event in [
+            "on_member_update",
+            "on_member_remove",
+            "on_guild_role_update",
+            "on_guild_role_delete",
+        ]:
+            bot.add_listener(getattr(self, event), event)
@@ -0,0 +1,46 @@
+import time
+from typing import Dict, Optional, Set
+
+
+class Sighting:
+    def __init__(self, server_name: str, username: str, seen: float):
+        self.server_name = server_name
+        self.username = username
+        self.seen = seen
+        self.online = True
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.seen
+
+
+class PlayerIndex:
+    """Where each UniqueId was seen last, kept current by the RefreshList answers.
+
+    A player missing from a later answer of the same server stays indexed but is no
+    longer online there.
+    """
+
+    def __init__(self):
+        self._players: Dict[str, Sighting] = dict()
+        self._online: Dict[str, Set[str]] = dict()
+
+    def observe(self, server_name: str, data):
+        now = time.time()
+        players = {
+            str(player.get("UniqueId")): player.get("Username") or ""
+            for player in (data or {}).get("PlayerList") or []
+            if player.get("UniqueId")
+        }
+        server = server_name.casefold()
+        for unique_id in self._online.get(server, set()) - players.keys():
+            sighting = self._players.get(unique_id)
+            if sighting is not None and sighting.server_name.casefold() == server:
+                sighting.online = False
+        for unique_id, username in players.items():
+            self._players[unique_id] = Sighting(server_name, username, now)
+        self._online[server] = set(players)
+
+    def get(self, unique_id: str) -> Optional[Sighting]:
+        return self._players.get(str(unique_id))
+
@@ -0,0 +1,300 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Dict, List, Tuple
+
+from pavlov import PavlovRCON
+
+from bot.utils.metrics import rcon_errors, rcon_rtt
+
+RCON_TIMEOUT = 5
+POOL_MAX_SIZE = 2  # open connections per server
+POOL_IDLE_TIMEOUT = 600  # seconds
+POOL_KEEPALIVE_INTERVAL = 60  # seconds
+KEEPALIVE_COMMAND = "ServerInfo"
+
+# commands without side effects, concurrent identical requests of those share one answer
+READ_ONLY_COMMANDS = {
+    "ServerInfo",
+    "RefreshList",
+    "MapList",
+    "Blacklist",
+    "ItemList",
+    "InspectPlayer",
+}
+
+# pause between consecutive commands to one server, derived from its measured round-trip time
+PACING_INITIAL = 0.1  # seconds
+PACING_MIN = 0.02
+PACING_MAX = 1.0
+PACING_RTT_FACTOR = 0.5
+PACING_SMOOTHING = 0.3
+
+# errors after which a reused connection is considered stale, read-only commands are retried once
+RECONNECT_ERRORS = (ConnectionError, asyncio.IncompleteReadError)
+
+
+class StaleConnection(ConnectionError):
+    pass
+
+
+class PooledRCON(PavlovRCON):
+    def __init__(self, ip, port, password, timeout=RCON_TIMEOUT):
+        super().__init__(ip, port, password, timeout=timeout)
+        self.settings = (ip, port, password)
+
+    def is_usable(self) -> bool:
+        """Connected and not closed by the peer while idle, as far as is known already."""
+        return self.is_connected() and not self.reader.at_eof()
+
+
+def is_read_only(command: str) -> bool:
+    return command.split(" ", 1)[0] in READ_ONLY_COMMANDS
+
+
+class AdaptivePacer:
+    """Paces a sequence of commands to one server by a smoothed round-trip time."""
+
+    def __init__(self, delay: float = PACING_INITIAL):
+        self.delay = delay
+        self.rtt = None
+        self._sent = 0
+
+    def _update(self, rtt: float):
+        if self.rtt is None:
+            self.rtt = rtt
+        else:
+            self.rtt = PACING_SMOOTHING * rtt + (1 - PACING_SMOOTHING) * self.rtt
+        self.delay = min(PACING_MAX, max(PACING_MIN, self.rtt * PACING_RTT_FACTOR))
+
+    async def run(self, request: Awaitable):
+        """Awaits `request` after pausing if a previous request was paced."""
+        if self._sent:
+            await asyncio.sleep(self.delay)
+        self._sent += 1
+        started = time.monotonic()
+        data = await request
+        self._update(time.monotonic() - started)
+        return data
+
+
+class RconPool:
+    """Bot-wide pool of authenticated RCON connections, keyed by server name.
+
+    Connections are checked out exclusively for a single command, since the RCON
+    protocol has no request ids to match answers to concurrent requests. Identical
+    read-only commands in flight at the same time are sent once and all callers get
+    the same decoded answer, which therefore must not be modified.
+    """
+
+    def __init__(
+        self,
+        servers,
+        max_size: int = POOL_MAX_SIZE,
+        idle_timeout: int = POOL_IDLE_TIMEOUT,
+        keepalive_interval: int = POOL_KEEPALIVE_INTERVAL,
+    ):
+        self._servers = servers
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.keepalive_interval = keepalive_interval
+        self._idle: Dict[str, List[Tuple[PooledRCON, float]]] = {}
+        self._limits: Dict[str, asyncio.Semaphore] = {}
+        self._inflight: Dict[Tuple[str, str], asyncio.Future] = {}
+        self._maintenance_task = None
+
+    def _key(self, server_name: str) -> str:
+        return server_name.lower()
+
+    def _limit(self, key: str) -> asyncio.Semaphore:
+        limit = self._limits.get(key)
+        if limit is None:
+            limit = asyncio.Semaphore(self.max_size)
+            self._limits[key] = limit
+        return limit
+
+    def _settings(self, server_name: str):
+        try:
+            server = self._servers.get(server_name)
+        except self._servers.ServerNotFoundError:
+            return None
+        return server.get("ip"), server.get("port"), server.get("password")
+
+    async def _connect(self, server_name: str) -> PooledRCON:
+        server = self._servers.get(server_name)
+        rcon = PooledRCON(
+            server.get("ip"), server.get("port"), server.get("password"), timeout=RCON_TIMEOUT,
+        )
+        await rcon.open()
+        return rcon
+
+    async def _checkout(self, server_name: str) -> Tuple[PooledRCON, bool]:
+        idle = self._idle.get(self._key(server_name), [])
+        while idle:
+            rcon, _ = idle.pop()
+            if rcon.is_usable():
+                return rcon, True
+            await self._close(rcon)
+        return await self._connect(server_name), False
+
+    def _checkin(self, server_name: str, rcon: PooledRCON):
+        if rcon.settings != self._settings(server_name):
+            # server settings were reloaded while the connection was in use
+            asyncio.ensure_future(self._close(rcon))
+            return
+        self._idle.setdefault(self._key(server_name), []).append((rcon, time.monotonic()))
+
+    @staticmethod
+    async def _close(rcon: PavlovRCON):
+        try:
+            await rcon.close()
+        except Exception as ex:
+            logging.debug(f"RCON close failed with {ex}")
+
+    async def _send(self, key: str, rcon: PavlovRCON, command: str):
+        started = time.monotonic()
+        data = await rcon.send(command)
+        rcon_rtt.observe(time.monotonic() - started, key)
+        if data == "":  # peer closed the socket while the connection was idle
+            raise StaleConnection
+        return data
+
+    async def send(self, server_name: str, command: str):
+        if not is_read_only(command):
+            return await self._send_pooled(server_name, command)
+        key = (self._key(server_name), command)
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self._send_pooled(server_name, command))
+            self._inflight[key] = future
+            future.add_done_callback(lambda f: self._request_done(key, f))
+        # shielded, so a cancelled caller does not cancel the request for everyone else
+        return await asyncio.shield(future)
+
+    def _request_done(self, key: Tuple[str, str], future: asyncio.Future):
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+        if not future.cancelled():
+            future.exception()  # retrieved, even if every caller went away
+
+    async def _send_pooled(self, server_name: str, command: str):
+        try:
+            return await self._send_limited(server_name, command)
+        except self._servers.ServerNotFoundError:
+            raise
+        except Exception as ex:
+            rcon_errors.inc(self._key(server_name), type(ex).__name__)
+            raise
+
+    async def _send_limited(self, server_name: str, command: str):
+        async with self._limit(self._key(server_name)):
+            rcon, reused = await self._checkout(server_name)
+            try:
+                data = await self._send(self._key(server_name), rcon, command)
+            except RECONNECT_ERRORS:
+                await self._close(rcon)
+                # a command with side effects may have reached the server before the error
+                if not reused or not is_read_only(command):
+                    raise
+                logging.info(f"RCON connection to {server_name} went stale, reconnecting")
+                rcon = await self._connect(server_name)
+                try:
+                    data = await self._send(self._key(server_name), rcon, command)
+                except BaseException:
+                    await self._close(rcon)
+                    raise
+            except BaseException:
+                # timeouts and cancellation leave unread replies on the socket
+                await self._close(rcon)
+                raise
+            if isinstance(data, dict):
+                self._checkin(server_name, rcon)
+            else:
+                # a reply that is no JSON object was cut off, the rest of it is still unread
+                logging.warning(f"RCON reply to {command} on {server_name} is incomplete")
+                await self._close(rcon)
+            return data
+
+    async def _warm(self, server_name: str):
+        async with self._limit(self._key(server_name)):
+            if self._idle.get(self._key(server_name)):
+                return
+            try:
+                rcon = await self._connect(server_name)
+            except Exception as ex:
+                logging.warning(f"RCON warm up for {server_name} failed with {ex!r}")
+                return
+            self._checkin(server_name, rcon)
+
+    async def warm(self, server_names: List[str]):
+        """Opens one authenticated connection per server, in parallel."""
+        await asyncio.gather(*[self._warm(name) for name in server_names])
+
+    async def _keepalive(self, key: str, rcon: PavlovRCON) -> bool:
+        async with self._limit(key):
+            try:
+                data = await asyncio.wait_for(
+                    self._send(key, rcon, KEEPALIVE_COMMAND), RCON_TIMEOUT
+                )
+            except Exception as ex:
+                logging.info(f"RCON keepalive for {key} failed with {ex!r}")
+                await self._close(rcon)
+                return False
+            if not isinstance(data, dict):
+                logging.info(f"RCON keepalive reply for {key} is incomplete")
+                await self._close(rcon)
+                return False
+            return True
+
+    async def _maintain(self):
+        now = time.monotonic()
+        for key, idle in list(self._idle.items()):
+            for entry in list(idle):
+                rcon, last_used = entry
+                if not rcon.is_connected() or now - last_used > self.idle_timeout:
+                    idle.remove(entry)
+                    await self._close(rcon)
+            for entry in [e for e in idle if now - e[1] > self.keepalive_interval]:
+                if entry not in idle:  # checked out in the meantime
+                    continue
+                idle.remove(entry)
+                if not await self._keepalive(key, entry[0]):
+                    continue
+                if self._idle.get(key) is idle:
+                    # keepalive does not count as usage for idle reaping
+                    idle.insert(0, entry)
+                else:
+                    await self._close(entry[0])
+
+    async def _maintenance_loop(self):
+        while True:
+            await asyncio.sleep(self.keepalive_interval)
+            try:
+                await self._maintain()
+            except Exception as ex:
+                logging.error(f"RCON pool maintenance failed with {ex!r}")
+
+    def start(self):
+        if self._maintenance_task is None or self._maintenance_task.done():
+            self._maintenance_task = asyncio.get_event_loop().create_task(
+                self._maintenance_loop()
+            )
+
+    async def discard(self, server_name: str):
+        """Closes all idle connections of a server, e.g. after its settings changed."""
+        for rcon, _ in self._idle.pop(self._key(server_name), []):
+            await self._close(rcon)
+
+    async def sync(self):
+        """Closes idle connections of servers that were removed or changed."""
+        for key, idle in list(self._idle.items()):
+            for entry in list(idle):
+                if entry[0].settings != self._settings(key):
+                    idle.remove(entry)
+                    await self._close(entry[0])
+
+    async def close(self):
+        if self._maintenance_task is not None:
+            self._maintenance_task.cancel()
+        for key in list(self._idle.keys()):
+            await self.discard(key)
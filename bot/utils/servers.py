@@ -1,6 +1,9 @@
 import json
 import os
 
+REQUIRED_SERVER_KEYS = ["ip", "port", "password"]
+ALL_SERVERS = "all"  # group of every server, unless a server or group has that name
+
 
 class ServerNotFoundError(Exception):
     def __init__(self, server_name: str):
@@ -11,26 +14,93 @@ class Servers:
     def __init__(self, filename="servers.json"):
         self._filename = filename
         self._servers = {}
+        self._index = {}
+        self._groups = {}
         self.ServerNotFoundError = ServerNotFoundError
         if not os.path.isfile(filename):
             with open(filename, "w") as file:
-                json.dump("{}", file)
+                json.dump({}, file)
         with open(filename) as file:
-            self._servers = json.load(file)
+            self.apply(self.parse(json.load(file)))
+
+    @property
+    def filename(self):
+        return self._filename
+
+    @staticmethod
+    def parse(data):
+        """Validates servers.json data and builds its indexes, raises ValueError if invalid."""
+        if not isinstance(data, dict):
+            raise ValueError("servers have to be an object of server name to server")
+        index = {}
+        groups = {}
+        for name, server in data.items():
+            if not isinstance(server, dict):
+                raise ValueError(f"server {name} has to be an object")
+            missing = [key for key in REQUIRED_SERVER_KEYS if key not in server]
+            if missing:
+                raise ValueError(f"server {name} is missing {', '.join(missing)}")
+            if not isinstance(server.get("admins", []), list):
+                raise ValueError(f"admins of server {name} have to be a list")
+            server_groups = server.get("groups", [])
+            if not isinstance(server_groups, list) or not all(
+                isinstance(group, str) and group for group in server_groups
+            ):
+                raise ValueError(f"groups of server {name} have to be a list of names")
+            index.setdefault(name.casefold(), name)
+            for group in server_groups:
+                members = groups.setdefault(group.casefold(), [])
+                if name not in members:
+                    members.append(name)
+        clashes = [group for group in groups if group in index]
+        if clashes:
+            raise ValueError(f"groups {', '.join(clashes)} have the name of a server")
+        return data, index, groups
+
+    def apply(self, parsed):
+        self._servers, self._index, self._groups = parsed
 
     def get(self, name: str):
         server = self._servers.get(name)
         if server is None:
-            for key in self._servers.keys():
-                if key.lower() == name.lower():
-                    server = self._servers.get(key)
-                    break
-            else:
+            key = self._index.get(name.casefold())
+            if key is None:
                 raise ServerNotFoundError(name)
+            server = self._servers.get(key)
         return server
 
+    def get_name(self, name: str) -> str:
+        """Server `name` as spelled in servers.json."""
+        key = self._index.get(name.casefold())
+        if key is None:
+            raise ServerNotFoundError(name)
+        return key
+
+    def get_group(self, name: str):
+        """Names of the servers in group `name`, None if it is a server or no group."""
+        if name.casefold() in self._index:
+            return None
+        members = self._groups.get(name.casefold())
+        if members is None and name.casefold() == ALL_SERVERS:
+            return list(self._servers.keys())
+        return list(members) if members is not None else None
+
+    def get_groups(self):
+        """Lower-cased group names to the names of their servers."""
+        return {group: list(members) for group, members in self._groups.items()}
+
     def get_names(self, server_group: str = None):
-        return list(self._servers.keys())
+        """All server names, or those of a group or a single server."""
+        if server_group is None:
+            return list(self._servers.keys())
+        members = self.get_group(server_group)
+        if members is not None:
+            return members
+        if server_group.casefold() in self._index:
+            return [self._index[server_group.casefold()]]
+        raise ServerNotFoundError(server_group)
 
     def get_servers(self, server_group: str = None):
-        return self._servers
+        if server_group is None:
+            return self._servers
+        return {name: self._servers[name] for name in self.get_names(server_group)}
@@ -0,0 +1,170 @@
+import asyncio
+import logging
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+SESSIONS_QUERY_LIMIT = 100  # sessions returned by one query at most
+# seconds without a player list of a server after which its open sessions count as ended
+SESSIONS_STALE_AFTER = 900
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    unique_id TEXT NOT NULL,
+    username TEXT NOT NULL,
+    username_key TEXT NOT NULL,
+    server TEXT NOT NULL,
+    server_key TEXT NOT NULL,
+    joined REAL NOT NULL,
+    left REAL
+);
+CREATE INDEX IF NOT EXISTS sessions_player ON sessions (unique_id, joined);
+CREATE INDEX IF NOT EXISTS sessions_username ON sessions (username_key, joined);
+CREATE INDEX IF NOT EXISTS sessions_server ON sessions (server_key, joined);
+CREATE INDEX IF NOT EXISTS sessions_open ON sessions (server_key) WHERE left IS NULL;
+CREATE TABLE IF NOT EXISTS observations (
+    server TEXT PRIMARY KEY,
+    seen REAL NOT NULL
+);
+"""
+
+
+class Session:
+    def __init__(
+        self, unique_id: str, username: str, server: str, joined: float, left: Optional[float]
+    ):
+        self.unique_id = unique_id
+        self.username = username
+        self.server = server
+        self.joined = joined
+        self.left = left
+
+    @property
+    def online(self) -> bool:
+        return self.left is None
+
+    @property
+    def duration(self) -> float:
+        return (self.left or time.time()) - self.joined
+
+
+class SessionStore:
+    """Join and leave times of players per server, in sqlite.
+
+    Successive `RefreshList` answers of a server are diffed, players who appeared open
+    a session and players who are gone close theirs. A server's open sessions are
+    taken over from the database on its first observation, so a restart only closes
+    the sessions of players who left meanwhile. Sessions keep the server name they
+    were observed under, lookups by server ignore case. All database work happens in
+    one thread, outside the event loop.
+
+    Without a player list for `stale_after` seconds nobody knows who stayed, open
+    sessions then count as ended at the last observation of their server, both in
+    queries and once the server is observed again.
+    """
+
+    def __init__(self, filename: str = "sessions.db", stale_after: float = SESSIONS_STALE_AFTER):
+        self.filename = filename
+        self.stale_after = stale_after
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sessions")
+        self._connection: Optional[sqlite3.Connection] = None
+        # server -> unique_id -> id of the open session, for servers observed since start
+        self._online: Dict[str, Dict[str, int]] = dict()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self._connection = sqlite3.connect(self.filename, check_same_thread=False)
+            self._connection.executescript(SCHEMA)
+        return self._connection
+
+    async def _run(self, func, *args):
+        return await asyncio.get_event_loop().run_in_executor(self._executor, func, *args)
+
+    def observe(self, server_name: str, data):
+        """Records a `RefreshList` answer, without waiting for the database."""
+        players = {
+            str(player.get("UniqueId")): player.get("Username") or ""
+            for player in (data or {}).get("PlayerList") or []
+            if player.get("UniqueId")
+        }
+        now = time.time()
+        future = asyncio.ensure_future(self._run(self._observe, server_name, players, now))
+        future.add_done_callback(self._observed)
+
+    @staticmethod
+    def _observed(future: asyncio.Future):
+        if not future.cancelled() and future.exception() is not None:
+            logging.error(f"SESSIONS: recording players failed with {future.exception()!r}")
+
+    def _observe(self, server_name: str, players: Dict[str, str], now: float):
+        connection = self._connect()
+        server = server_name.casefold()
+        online = self._online.get(server)
+        if online is None:
+            rows = connection.execute(
+                "SELECT unique_id, id FROM sessions WHERE server_key = ? AND left IS NULL",
+                (server,),
+            )
+            online = self._online[server] = dict(rows.fetchall())
+        seen = connection.execute("SELECT seen FROM observations WHERE server = ?", (server,))
+        previous = (seen.fetchone() or [None])[0]
+        with connection:
+            if previous is not None and now - previous > self.stale_after:
+                # the players are only known to have been there until the last observation
+                connection.executemany(
+                    "UPDATE sessions SET left = ? WHERE id = ?",
+                    [(previous, row) for row in online.values()],
+                )
+                online.clear()
+            left = [online.pop(unique_id) for unique_id in list(online) if unique_id not in players]
+            connection.executemany(
+                "UPDATE sessions SET left = ? WHERE id = ?", [(now, row) for row in left]
+            )
+            for unique_id in [unique_id for unique_id in players if unique_id not in online]:
+                username = players[unique_id]
+                cursor = connection.execute(
+                    "INSERT INTO sessions"
+                    " (unique_id, username, username_key, server, server_key, joined)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    (unique_id, username, username.casefold(), server_name, server, now),
+                )
+                online[unique_id] = cursor.lastrowid
+            connection.execute(
+                "INSERT OR REPLACE INTO observations (server, seen) VALUES (?, ?)", (server, now)
+            )
+
+    def _query(self, column: str, value: str, since: float, limit: int) -> List[Session]:
+        # open sessions of servers not observed for a while ended at their last observation
+        rows = self._connect().execute(
+            f"SELECT s.unique_id, s.username, s.server, s.joined,"
+            f" CASE WHEN s.left IS NULL AND o.seen < ? THEN o.seen ELSE s.left END"
+            f" FROM sessions s LEFT JOIN observations o ON o.server = s.server_key"
+            f" WHERE s.{column} = ? AND s.joined >= ? ORDER BY s.joined DESC LIMIT ?",
+            (time.time() - self.stale_after, value, since, limit),
+        )
+        return [Session(*row) for row in rows.fetchall()]
+
+    async def player(
+        self, unique_id: str, since: float = 0, limit: int = SESSIONS_QUERY_LIMIT
+    ) -> List[Session]:
+        """Sessions of a player, newest first."""
+        return await self._run(self._query, "unique_id", str(unique_id), since, limit)
+
+    async def username(
+        self, username: str, since: float = 0, limit: int = SESSIONS_QUERY_LIMIT
+    ) -> List[Session]:
+        """Sessions under an in-game name, ignoring case, newest first."""
+        return await self._run(self._query, "username_key", username.casefold(), since, limit)
+
+    async def server(
+        self, server_name: str, since: float = 0, limit: int = SESSIONS_QUERY_LIMIT
+    ) -> List[Session]:
+        """Sessions on a server, newest first."""
+        return await self._run(self._query, "server_key", server_name.casefold(), since, limit)
+
+    def close(self):
+        if self._connection is not None:
+            self._executor.submit(self._connection.close).result()
+            self._connection = None
@@ -0,0 +1,30 @@
+import time
+from typing import List, Tuple
+
+
+class StartupTimer:
+    """Durations of the startup phases, from loading the config to the gateway connection."""
+
+    def __init__(self):
+        self.created = time.perf_counter()
+        self.phases: List[Tuple[str, float]] = list()
+        self._last = self.created
+        self.reported = False
+
+    def mark(self, phase: str):
+        """Ends `phase`, which began when the previous phase ended."""
+        now = time.perf_counter()
+        self.phases.append((phase, now - self._last))
+        self._last = now
+
+    def started_at(self, started: float, phase: str = "imports"):
+        """Adds the time from `started` until this timer was created as the first phase."""
+        self.phases.insert(0, (phase, self.created - started))
+
+    def report(self) -> str:
+        total = sum(duration for _, duration in self.phases)
+        phases = ", ".join(f"{phase} {duration * 1000:.0f}ms" for phase, duration in self.phases)
+        return f"{total * 1000:.0f}ms ({phases})"
+
+
+startup = StartupTimer()
@@ -0,0 +1,93 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+# commands whose answers are kept as snapshots, whether polled or sent by a command
+SNAPSHOT_COMMANDS = {"ServerInfo", "RefreshList", "MapList"}
+POLLED_COMMANDS = ["ServerInfo", "RefreshList"]
+
+
+def command_name(command: str) -> str:
+    return command.split(" ", 1)[0]
+
+
+class ServerStatus:
+    """Timestamped snapshots of read-only RCON answers per server.
+
+    Snapshots are refreshed by an optional background poller and by every live read,
+    read commands can serve from them when they are fresher than the age they accept.
+    """
+
+    def __init__(self, servers, send: Callable[[str, str], Awaitable[Any]]):
+        self._servers = servers
+        self._send = send
+        self._snapshots: Dict[Tuple[str, str], Tuple[float, Any]] = {}
+        self._poll_task = None
+        self._listeners: Dict[str, List[Callable[[str, Any], None]]] = {}
+        self.interval = 0
+
+    def add_listener(self, command: str, listener: Callable[[str, Any], None]):
+        """Calls `listener(server_name, data)` with every fresh answer to `command`."""
+        self._listeners.setdefault(command, []).append(listener)
+
+    def _key(self, server_name: str, command: str) -> Tuple[str, str]:
+        return server_name.lower(), command
+
+    def get(self, server_name: str, command: str, max_age: float):
+        snapshot = self._snapshots.get(self._key(server_name, command))
+        if snapshot is None:
+            return None
+        timestamp, data = snapshot
+        if time.monotonic() - timestamp > max_age:
+            return None
+        return data
+
+    def update(self, server_name: str, command: str, data):
+        if command not in SNAPSHOT_COMMANDS:
+            return
+        self._snapshots[self._key(server_name, command)] = (time.monotonic(), data)
+        for listener in self._listeners.get(command, []):
+            try:
+                listener(server_name, data)
+            except Exception as ex:
+                logging.error(f"STATUS: {command} listener failed with {ex!r}")
+
+    def invalidate(self, server_name: str):
+        server = server_name.lower()
+        for key in [key for key in self._snapshots if key[0] == server]:
+            del self._snapshots[key]
+
+    async def _poll_server(self, server_name: str):
+        for command in POLLED_COMMANDS:
+            try:
+                data = await self._send(server_name, command)
+            except Exception as ex:
+                logging.debug(f"STATUS: polling {command} on {server_name} failed with {ex!r}")
+                return
+            self.update(server_name, command, data)
+
+    async def poll(self):
+        await asyncio.gather(*[self._poll_server(name) for name in self._servers.get_names()])
+
+    async def _poll_loop(self):
+        while True:
+            started = time.monotonic()
+            try:
+                await self.poll()
+            except Exception as ex:
+                logging.error(f"STATUS: polling failed with {ex!r}")
+            await asyncio.sleep(max(0.0, self.interval - (time.monotonic() - started)))
+
+    def start(self, interval: float):
+        """Starts polling every `interval` seconds, a falsy interval disables polling."""
+        self.interval = interval
+        if not interval:
+            return
+        if self._poll_task is None or self._poll_task.done():
+            self._poll_task = asyncio.get_event_loop().create_task(self._poll_loop())
+
+    def stop(self):
+        if self._poll_task is not None:
+            self._poll_task.cancel()
+            self._poll_task = None
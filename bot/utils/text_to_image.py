@@ -1,7 +1,11 @@
+import asyncio
+import hashlib
 import io
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 
 import discord
-from PIL import Image, ImageDraw, ImageFont
 
 W_TEXT_PADDING = 40
 H_TEXT_PADDING = 80
@@ -9,25 +13,59 @@ FONTSIZE = 32
 BACKGROUND = (44, 47, 51)  # discord color
 TEXT_COLOR = (255, 255, 255)
 ROBOTO_MONO = "bot/utils/fonts/RobotoMono-Light.ttf"
-FONT = ImageFont.truetype(ROBOTO_MONO, FONTSIZE)
 
+PNG_COLORS = 16  # flat background and anti-aliased text need only a few shades
+IMAGE_CACHE_SIZE = 32
 
-def text_to_image(text: str, file_name: str) -> discord.File:
+# a single worker, so the font is never used by two threads at once
+_executor = ThreadPoolExecutor(max_workers=1)
+_image_cache = OrderedDict()
+
+
+@lru_cache(maxsize=1)
+def _font():
+    # Pillow and the font are loaded with the first image instead of at startup
+    from PIL import ImageFont
+
+    return ImageFont.truetype(ROBOTO_MONO, FONTSIZE)
+
+
+@lru_cache(maxsize=4096)
+def _line_size(line: str):
+    return _font().getsize(line)
+
+
+def render_text(text: str) -> bytes:
+    from PIL import Image, ImageDraw
 
     text_w, text_h = list(), list()
 
     for line in text.split("\n"):
-        w, h = FONT.getsize(line)
+        w, h = _line_size(line)
         text_w.append(w)
         text_h.append(h)
 
     image = Image.new(
-        "RGBA", (max(text_w) + W_TEXT_PADDING, sum(text_h) + H_TEXT_PADDING), BACKGROUND
+        "RGB", (max(text_w) + W_TEXT_PADDING, sum(text_h) + H_TEXT_PADDING), BACKGROUND
     )
     draw = ImageDraw.Draw(image)
 
-    draw.text((W_TEXT_PADDING / 2, 0), text, TEXT_COLOR, font=FONT)
+    draw.text((W_TEXT_PADDING / 2, 0), text, TEXT_COLOR, font=_font())
     data = io.BytesIO()
-    image.save(data, format="PNG")
-    data.seek(0)
-    return discord.File(data, file_name)
+    image.quantize(colors=PNG_COLORS).save(data, format="PNG", optimize=True)
+    return data.getvalue()
+
+
+async def text_to_image(text: str, file_name: str) -> discord.File:
+    """Renders text off the event loop, identical texts are rendered only once."""
+    key = hashlib.sha1(text.encode()).hexdigest()
+    data = _image_cache.get(key)
+    if data is None:
+        loop = asyncio.get_event_loop()
+        data = await loop.run_in_executor(_executor, render_text, text)
+        _image_cache[key] = data
+        while len(_image_cache) > IMAGE_CACHE_SIZE:
+            _image_cache.popitem(last=False)
+    else:
+        _image_cache.move_to_end(key)
+    return discord.File(io.BytesIO(data), file_name)
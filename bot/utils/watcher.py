@@ -0,0 +1,77 @@
+import asyncio
+import json
+import logging
+import os
+from typing import Awaitable, Callable, Optional
+
+WATCH_INTERVAL = 5  # seconds
+
+
+class Watch:
+    def __init__(self, target, on_reload: Optional[Callable[[], Awaitable]]):
+        self.target = target
+        self.on_reload = on_reload
+        self.stat = FileWatcher.stat(target.filename)
+
+
+class FileWatcher:
+    """Reloads JSON backed objects when their file changes.
+
+    Watched objects provide `filename`, `parse(data)` which validates the data and
+    builds everything derived from it, and `apply(parsed)` which swaps it in. Files
+    are read and parsed off the event loop, invalid files keep the previous data.
+    """
+
+    def __init__(self, interval: float = WATCH_INTERVAL):
+        self.interval = interval
+        self._watches = list()
+        self._task = None
+
+    @staticmethod
+    def stat(filename: str):
+        try:
+            stat = os.stat(filename)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    @staticmethod
+    def _read(target):
+        with open(target.filename) as file:
+            return target.parse(json.load(file))
+
+    def watch(self, target, on_reload: Callable[[], Awaitable] = None):
+        self._watches.append(Watch(target, on_reload))
+
+    async def _check(self, watch: Watch):
+        loop = asyncio.get_event_loop()
+        filename = watch.target.filename
+        stat = await loop.run_in_executor(None, self.stat, filename)
+        if stat is None or stat == watch.stat:
+            return
+        watch.stat = stat
+        try:
+            parsed = await loop.run_in_executor(None, self._read, watch.target)
+        except Exception as ex:
+            logging.error(f"RELOAD: {filename} is invalid, keeping previous version: {ex}")
+            return
+        watch.target.apply(parsed)
+        logging.info(f"RELOAD: {filename} reloaded")
+        if watch.on_reload is not None:
+            await watch.on_reload()
+
+    async def check(self):
+        for watch in self._watches:
+            try:
+                await self._check(watch)
+            except Exception as ex:
+                logging.error(f"RELOAD: checking {watch.target.filename} failed with {ex!r}")
+
+    async def _watch_loop(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.check()
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_event_loop().create_task(self._watch_loop())
@@ -0,0 +1,199 @@
+import asyncio
+import html
+import json
+import logging
+import os
+import re
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from bot.utils.metrics import workshop_cache
+
+WORKSHOP_URL = "https://steamcommunity.com/sharedfiles/filedetails/?id={}"
+
+CACHE_TTL = 7 * 24 * 60 * 60  # seconds
+CACHE_MAX_SIZE = 2000
+NEGATIVE_TTL = 5 * 60  # seconds, doubled for every consecutive failure
+NEGATIVE_MAX_TTL = 24 * 60 * 60
+
+TITLE_REGEX = re.compile(r"<title>(.*?)</title>", re.IGNORECASE | re.DOTALL)
+IMAGE_REGEX = re.compile(r"(https:\/\/steamuserimages-a\.akamaihd\.net\/ugc\/[A-Z0-9\/]*)")
+
+
+class WorkshopParseError(Exception):
+    pass
+
+
+def parse_workshop_page(page: str) -> Tuple[str, Optional[str]]:
+    """Extracts map name and preview image without parsing the whole page."""
+    if not page:
+        raise WorkshopParseError("empty page")
+    title = TITLE_REGEX.search(page)
+    if title is None or "::" not in title.group(1):
+        raise WorkshopParseError("no workshop title")
+    map_name = html.unescape(title.group(1)).split("::")[1].strip()
+    image = IMAGE_REGEX.search(page)
+    return map_name, image.group(1) if image else None
+
+
+class WorkshopCache:
+    """Persistent cache of Steam workshop map names and images, keyed by map label.
+
+    Entries live in a JSON lines file in which the last line per label wins. Failed
+    lookups are cached as negative entries with an exponential backoff. The file is
+    read and written in one thread, outside the event loop.
+    """
+
+    def __init__(
+        self,
+        filename="workshop_cache.jsonl",
+        ttl: int = CACHE_TTL,
+        max_size: int = CACHE_MAX_SIZE,
+    ):
+        self._filename = filename
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, dict]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._lines = 0
+        self._loaded = False
+        self._loading: Optional[asyncio.Future] = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="workshop")
+
+    async def _ensure_loaded(self):
+        """Reads the cache file in a thread on first use, rather than while the bot starts."""
+        if self._loading is None:
+            loop = asyncio.get_event_loop()
+            self._loading = asyncio.ensure_future(
+                loop.run_in_executor(self._executor, self._load)
+            )
+        await asyncio.shield(self._loading)
+
+    def _load(self):
+        """Reads and compacts the cache file, blocks."""
+        if not os.path.isfile(self._filename):
+            self._loaded = True
+            return
+        with open(self._filename) as file:
+            for line in file:
+                self._lines += 1
+                try:
+                    entry = json.loads(line)
+                    label = entry["label"]
+                except (ValueError, KeyError):
+                    continue
+                self._entries.pop(label, None)
+                self._entries[label] = entry
+        now = time.time()
+        for label in [l for l, e in self._entries.items() if e.get("expires", 0) < now]:
+            del self._entries[label]
+        self._evict()
+        if self._lines > 2 * len(self._entries):
+            self._lines = len(self._entries)
+            self._compact(list(self._entries.values()))
+        self._loaded = True
+
+    def _append(self, entry: dict):
+        with open(self._filename, "a") as file:
+            file.write(json.dumps(entry) + "\n")
+
+    def _compact(self, entries: List[dict]):
+        tmp_filename = f"{self._filename}.tmp"
+        with open(tmp_filename, "w") as file:
+            for entry in entries:
+                file.write(json.dumps(entry) + "\n")
+        os.replace(tmp_filename, self._filename)
+
+    def _evict(self):
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def _store(self, entry: dict):
+        """Caches `entry` and writes it to the file, without waiting for the write."""
+        label = entry["label"]
+        self._entries.pop(label, None)
+        self._entries[label] = entry
+        self._evict()
+        self._lines += 1
+        loop = asyncio.get_event_loop()
+        if self._lines > 2 * self.max_size:
+            # the snapshot is taken here, it already contains `entry`
+            self._lines = len(self._entries)
+            write = loop.run_in_executor(
+                self._executor, self._compact, list(self._entries.values())
+            )
+        else:
+            write = loop.run_in_executor(self._executor, self._append, entry)
+        asyncio.ensure_future(write).add_done_callback(self._written)
+
+    @staticmethod
+    def _written(future: asyncio.Future):
+        if not future.cancelled() and future.exception() is not None:
+            logging.error(f"Writing workshop cache failed with {future.exception()}")
+
+    def _lookup(self, map_label: str) -> Optional[dict]:
+        entry = self._entries.get(map_label)
+        if entry is None:
+            return None
+        if entry.get("expires", 0) < time.time():
+            return None
+        self._entries.move_to_end(map_label)
+        return entry
+
+    async def _fetch(self, map_label: str, fetch: Callable[[str], Awaitable[str]]):
+        previous = self._entries.get(map_label, {})
+        try:
+            page = await fetch(WORKSHOP_URL.format(map_label[len("UGC"):]))
+            loop = asyncio.get_event_loop()
+            map_name, map_image = await loop.run_in_executor(None, parse_workshop_page, page)
+        except Exception as ex:
+            failures = previous.get("failures", 0) + 1 if previous.get("name") is None else 1
+            backoff = min(NEGATIVE_TTL * 2 ** (failures - 1), NEGATIVE_MAX_TTL)
+            logging.error(f"Getting map label {map_label} failed with {ex}, retry in {backoff}s")
+            self._store(
+                {
+                    "label": map_label,
+                    "name": None,
+                    "image": None,
+                    "failures": failures,
+                    "expires": time.time() + backoff,
+                }
+            )
+            return None, None
+        self._store(
+            {
+                "label": map_label,
+                "name": map_name,
+                "image": map_image,
+                "expires": time.time() + self.ttl,
+            }
+        )
+        return map_name, map_image
+
+    async def get(
+        self, map_label: str, fetch: Callable[[str], Awaitable[str]]
+    ) -> Tuple[Optional[str], Optional[str]]:
+        """Returns (map name, map image) of a workshop map label, (None, None) if unknown.
+
+        `fetch` downloads a workshop page, concurrent lookups of a label share one fetch.
+        """
+        if not map_label or not map_label.startswith("UGC"):
+            return None, None
+        if not self._loaded:
+            await self._ensure_loaded()
+        entry = self._lookup(map_label)
+        if entry is not None:
+            workshop_cache.inc("hit" if entry.get("name") is not None else "negative_hit")
+            return entry.get("name"), entry.get("image")
+        future = self._inflight.get(map_label)
+        if future is not None:
+            workshop_cache.inc("shared")
+        else:
+            workshop_cache.inc("miss")
+            future = asyncio.ensure_future(self._fetch(map_label, fetch))
+            self._inflight[map_label] = future
+            future.add_done_callback(lambda _: self._inflight.pop(map_label, None))
+        # shielded, so a cancelled caller does not cancel the fetch for everyone else
+        return await asyncio.shield(future)
@@ -1,3 +1,7 @@
-import bot
+import time
 
-bot.run()
+started = time.perf_counter()
+
+import bot  # noqa: E402, imported after the clock started to time the imports
+
+bot.run(started)